@@ -1,22 +1,44 @@
 import pathlib
-import time
 import uvicorn
-import redis.asyncio as redis
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi_limiter import FastAPILimiter
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 
-from src.database.db import get_db
-from src.routes import users, auth, stocks, products, company, purchase, transactions, exch_rate, accounts, movements
+from src.database.db import get_db, engine
+from src.services.compression import CompressionMiddleware
+from src.services.rate_limit import rate_limit_store
+from src.services.redis_pool import redis_manager
+from src.services.timing import TimingMiddleware, TimedRoute
+from src.routes import users, auth, stocks, products, company, purchase, transactions, exch_rate, accounts, movements, \
+    metrics
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    The lifespan function opens the shared resources when the application starts and closes them on shutdown:
+    the Redis pool used by auth, rate limiting and caches, the rate limit sync task and the database engine.
+
+    :param app: FastAPI: The application
+    :return: A context manager that yields while the application is running
+    """
+    await redis_manager.start()
+    rate_limit_store.start()
+    yield
+    await rate_limit_store.stop()
+    await redis_manager.close()
+    await engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = TimedRoute
 
 origins = [
             "*",
@@ -32,6 +54,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TimingMiddleware)
+app.add_middleware(CompressionMiddleware)
 
 
 # Обробник для відловлювання помилок валідації запиту
@@ -43,16 +67,7 @@ async def validation_exception_handler(request, exc):
     )
 
 
-@app.middleware('https')
-async def custom_middleware(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    during = time.time() - start_time
-    response.headers['performance'] = str(during)
-    return response
-
-
-@app.middleware("https")
+@app.middleware("http")
 async def errors_handling(request: Request, call_next):
     """
     The errors_handling function is a middleware that catches any exception raised by the application.
@@ -87,18 +102,18 @@ async def root(request: Request):
 
 
 @app.get("/api/healthchecker")
-def healthchecker(db: Session = Depends(get_db)):
+async def healthchecker(db: AsyncSession = Depends(get_db)):
     """
     The healthchecker function is a simple function that checks the health of the database.
     It does this by making a request to the database and checking if it returns any results.
     If there are no results, then we know something is wrong with our connection.
 
-    :param db: Session: Pass in the database session
+    :param db: AsyncSession: Pass in the database session
     :return: A dictionary with a message
     """
     try:
         # Make request
-        result = db.execute(text("SELECT 1")).fetchone()
+        result = (await db.execute(text("SELECT 1"))).fetchone()
         if result is None:
             raise HTTPException(status_code=500, detail="Database is not configured correctly")
         return {"message": "Welcome to FastAPI HOME OFFICE!"}
@@ -117,25 +132,7 @@ app.include_router(transactions.router, prefix='/api')
 app.include_router(exch_rate.router, prefix='/api')
 app.include_router(movements.router, prefix='/api')
 app.include_router(accounts.router, prefix='/api')
-
-
-@app.on_event("startup")
-async def startup():
-    """
-    The startup function is called when the application starts up.
-    It's a good place to initialize things that are needed by your app,
-    such as connecting to databases or initializing caches.
-
-    :return: A coroutine, so it must be awaited
-    """
-    from src.conf.config import settings
-    r = await redis.Redis(host=settings.redis_host,
-                          port=settings.redis_port,
-                          password=settings.redis_password,
-                          db=0,
-                          decode_responses=True,
-                          encoding="utf-8")
-    await FastAPILimiter.init(r)
+app.include_router(metrics.router, prefix='/api')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,46 @@
+"""add movements_daily
+
+Revision ID: 3f58b0e6a7d2
+Revises: 9a6c3d18f2e4
+Create Date: 2026-10-18 16:27:51.083316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f58b0e6a7d2'
+down_revision = '9a6c3d18f2e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('movements_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('payment_way', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=50), nullable=False),
+    sa.Column('account_type', sa.String(length=50), nullable=False),
+    sa.Column('operation_type', sa.String(length=50), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('movements_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('day', 'company_id', 'payment_way', 'currency', 'account_type', 'operation_type')
+    )
+    # Початкове заповнення куба з наявних рухів; 0 замість NULL у company_id/payment_way
+    op.execute("""
+        INSERT INTO movements_daily (day, company_id, payment_way, currency, account_type, operation_type,
+                                     total, movements_count, updated_at)
+        SELECT CAST(date AS DATE), COALESCE(company_id, 0), COALESCE(payment_way, 0),
+               currency, account_type, operation_type, SUM(sum), COUNT(id), now()
+        FROM movements
+        WHERE date IS NOT NULL
+        GROUP BY CAST(date AS DATE), COALESCE(company_id, 0), COALESCE(payment_way, 0),
+                 currency, account_type, operation_type
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('movements_daily')
@@ -0,0 +1,56 @@
+"""add transaction_turnover_monthly
+
+Revision ID: 4d91b7c2e6f3
+Revises: c3a8e51f0d27
+Create Date: 2026-10-18 11:03:17.920164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '4d91b7c2e6f3'
+down_revision = 'c3a8e51f0d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('transaction_turnover_monthly',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('currency', postgresql.ENUM('tl', 'eur', 'usd', name='currency_type', create_type=False), nullable=False),
+    sa.Column('accounting_type', postgresql.ENUM('GR Baris', 'ProOil', name='accounting_type', create_type=False), nullable=False),
+    sa.Column('expenses_category', postgresql.ENUM('buyer', 'capital', 'fixed', 'interest', 'investments', 'invoice_job', 'old_debt', 'settlements', 'variable', 'other', name='expensestype', create_type=False), nullable=False),
+    sa.Column('debit_turnover_tl', sa.Float(), nullable=False),
+    sa.Column('credit_turnover_tl', sa.Float(), nullable=False),
+    sa.Column('debit_turnover_usd', sa.Float(), nullable=False),
+    sa.Column('credit_turnover_usd', sa.Float(), nullable=False),
+    sa.Column('transactions_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('month', 'company_id', 'currency', 'accounting_type', 'expenses_category')
+    )
+    op.create_index('ix_transactions_date_company_id', 'transactions', ['date', 'company_id'], unique=False)
+    # Початкове заповнення помісячних агрегатів з наявних транзакцій
+    op.execute("""
+        INSERT INTO transaction_turnover_monthly (month, company_id, currency, accounting_type, expenses_category,
+                                                  debit_turnover_tl, credit_turnover_tl,
+                                                  debit_turnover_usd, credit_turnover_usd,
+                                                  transactions_count, updated_at)
+        SELECT CAST(date_trunc('month', date) AS DATE), company_id, currency, accounting_type, expenses_category,
+               SUM(CASE WHEN operation_type = 'debit' AND currency = 'tl' THEN sum ELSE 0 END),
+               SUM(CASE WHEN operation_type = 'credit' AND currency = 'tl' THEN sum ELSE 0 END),
+               SUM(CASE WHEN operation_type = 'debit' AND currency = 'usd' THEN sum ELSE 0 END),
+               SUM(CASE WHEN operation_type = 'credit' AND currency = 'usd' THEN sum ELSE 0 END),
+               COUNT(id), now()
+        FROM transactions
+        WHERE company_id IS NOT NULL AND date IS NOT NULL
+        GROUP BY CAST(date_trunc('month', date) AS DATE), company_id, currency, accounting_type, expenses_category
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_date_company_id', table_name='transactions')
+    op.drop_table('transaction_turnover_monthly')
@@ -0,0 +1,53 @@
+"""add account_balance_monthly
+
+Revision ID: 9a6c3d18f2e4
+Revises: e7f20a4b9c15
+Create Date: 2026-10-18 15:42:08.614203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a6c3d18f2e4'
+down_revision = 'e7f20a4b9c15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('account_balance_monthly',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=50), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('debit', sa.Float(), nullable=False),
+    sa.Column('credit', sa.Float(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.Column('movements_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('account_id', 'currency', 'month')
+    )
+    op.create_index('ix_movements_payment_way_date', 'movements', ['payment_way', 'date'], unique=False)
+    # Початкові контрольні точки: обороти за місяць і залишок наростаючим підсумком
+    op.execute("""
+        INSERT INTO account_balance_monthly (account_id, currency, month, debit, credit, movements_count,
+                                             balance, updated_at)
+        SELECT account_id, currency, month, debit, credit, movements_count,
+               SUM(debit - credit) OVER (PARTITION BY account_id, currency ORDER BY month), now()
+        FROM (
+            SELECT payment_way AS account_id, currency, CAST(date_trunc('month', date) AS DATE) AS month,
+                   SUM(CASE WHEN operation_type = 'debit' THEN sum ELSE 0 END) AS debit,
+                   SUM(CASE WHEN operation_type = 'credit' THEN sum ELSE 0 END) AS credit,
+                   COUNT(id) AS movements_count
+            FROM movements
+            WHERE payment_way IS NOT NULL AND date IS NOT NULL
+            GROUP BY payment_way, currency, CAST(date_trunc('month', date) AS DATE)
+        ) AS monthly
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_movements_payment_way_date', table_name='movements')
+    op.drop_table('account_balance_monthly')
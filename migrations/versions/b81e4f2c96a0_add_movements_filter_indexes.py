@@ -0,0 +1,31 @@
+"""add movements filter indexes
+
+Revision ID: b81e4f2c96a0
+Revises: 3f58b0e6a7d2
+Create Date: 2026-10-18 17:09:36.472915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81e4f2c96a0'
+down_revision = '3f58b0e6a7d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Рівності фільтра спереду, далі (date, id) - той самий індекс дає і відбір, і порядок сторінки
+    op.create_index('ix_movements_currency_date_id', 'movements', ['currency', 'date', 'id'], unique=False)
+    op.create_index('ix_movements_account_type_operation_type_date_id', 'movements',
+                    ['account_type', 'operation_type', 'date', 'id'], unique=False)
+    op.create_index('ix_movements_payment_way_currency_date_id', 'movements',
+                    ['payment_way', 'currency', 'date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_movements_payment_way_currency_date_id', table_name='movements')
+    op.drop_index('ix_movements_account_type_operation_type_date_id', table_name='movements')
+    op.drop_index('ix_movements_currency_date_id', table_name='movements')
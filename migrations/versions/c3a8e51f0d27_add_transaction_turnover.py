@@ -0,0 +1,53 @@
+"""add transaction_turnover
+
+Revision ID: c3a8e51f0d27
+Revises: a31007742ccb
+Create Date: 2026-10-18 10:12:41.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'c3a8e51f0d27'
+down_revision = 'a31007742ccb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('transaction_turnover',
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('currency', postgresql.ENUM('tl', 'eur', 'usd', name='currency_type', create_type=False), nullable=False),
+    sa.Column('accounting_type', postgresql.ENUM('GR Baris', 'ProOil', name='accounting_type', create_type=False), nullable=False),
+    sa.Column('expenses_category', postgresql.ENUM('buyer', 'capital', 'fixed', 'interest', 'investments', 'invoice_job', 'old_debt', 'settlements', 'variable', 'other', name='expensestype', create_type=False), nullable=False),
+    sa.Column('debit_turnover_tl', sa.Float(), nullable=False),
+    sa.Column('credit_turnover_tl', sa.Float(), nullable=False),
+    sa.Column('debit_turnover_usd', sa.Float(), nullable=False),
+    sa.Column('credit_turnover_usd', sa.Float(), nullable=False),
+    sa.Column('transactions_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('company_id', 'currency', 'accounting_type', 'expenses_category')
+    )
+    # Початкове заповнення rollup з наявних транзакцій
+    op.execute("""
+        INSERT INTO transaction_turnover (company_id, currency, accounting_type, expenses_category,
+                                          debit_turnover_tl, credit_turnover_tl,
+                                          debit_turnover_usd, credit_turnover_usd,
+                                          transactions_count, updated_at)
+        SELECT company_id, currency, accounting_type, expenses_category,
+               SUM(CASE WHEN operation_type = 'debit' AND currency = 'tl' THEN sum ELSE 0 END),
+               SUM(CASE WHEN operation_type = 'credit' AND currency = 'tl' THEN sum ELSE 0 END),
+               SUM(CASE WHEN operation_type = 'debit' AND currency = 'usd' THEN sum ELSE 0 END),
+               SUM(CASE WHEN operation_type = 'credit' AND currency = 'usd' THEN sum ELSE 0 END),
+               COUNT(id), now()
+        FROM transactions
+        WHERE company_id IS NOT NULL
+        GROUP BY company_id, currency, accounting_type, expenses_category
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('transaction_turnover')
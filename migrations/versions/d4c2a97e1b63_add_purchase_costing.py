@@ -0,0 +1,43 @@
+"""add purchase_costing
+
+Revision ID: d4c2a97e1b63
+Revises: b81e4f2c96a0
+Create Date: 2026-10-18 17:55:12.309847
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4c2a97e1b63'
+down_revision = 'b81e4f2c96a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('purchase_costing',
+    sa.Column('purchase_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('quantity_on_hand', sa.Float(), nullable=False),
+    sa.Column('avg_cost_tl', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('avg_cost_usd', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('value_tl', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('value_usd', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('cogs_tl', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('cogs_usd', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['purchase_id'], ['purchases.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('purchase_id')
+    )
+    op.create_index('ix_purchase_costing_product_id_date_purchase_id', 'purchase_costing',
+                    ['product_id', 'date', 'purchase_id'], unique=False)
+    # Ковзна середня рахується послідовно в Python - таблицю заповнює POST /api/purchase/valuation/rebuild
+
+
+def downgrade() -> None:
+    op.drop_index('ix_purchase_costing_product_id_date_purchase_id', table_name='purchase_costing')
+    op.drop_table('purchase_costing')
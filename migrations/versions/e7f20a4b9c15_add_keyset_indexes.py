@@ -0,0 +1,34 @@
+"""add keyset pagination indexes
+
+Revision ID: e7f20a4b9c15
+Revises: 4d91b7c2e6f3
+Create Date: 2026-10-18 12:21:05.337482
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7f20a4b9c15'
+down_revision = '4d91b7c2e6f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_transactions_date_id', 'transactions', ['date', 'id'], unique=False)
+    op.create_index('ix_transactions_company_id_date_id', 'transactions', ['company_id', 'date', 'id'], unique=False)
+    op.create_index('ix_movements_date_id', 'movements', ['date', 'id'], unique=False)
+    op.create_index('ix_movements_company_id_date_id', 'movements', ['company_id', 'date', 'id'], unique=False)
+    op.create_index('ix_purchases_date_id', 'purchases', ['date', 'id'], unique=False)
+    op.create_index('ix_purchases_company_id_date_id', 'purchases', ['company_id', 'date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_purchases_company_id_date_id', table_name='purchases')
+    op.drop_index('ix_purchases_date_id', table_name='purchases')
+    op.drop_index('ix_movements_company_id_date_id', table_name='movements')
+    op.drop_index('ix_movements_date_id', table_name='movements')
+    op.drop_index('ix_transactions_company_id_date_id', table_name='transactions')
+    op.drop_index('ix_transactions_date_id', table_name='transactions')
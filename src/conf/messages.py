@@ -17,4 +17,9 @@ CHAT_NOT_FOUND = "Chat not found"
 NOT_FOUND = "Not Found"
 EMAIL_CONFIRMED = "Your email is confirmed you can go to app page"
 
-FORBIDDEN = 'Operation forbidden'
\ No newline at end of file
+FORBIDDEN = 'Operation forbidden'
+
+INVALID_CURSOR = "Invalid cursor"
+INVALID_LANGUAGE = "Unknown language, expected one of: english_name, ukrainian_name, russian_name, turkish_name"
+INVALID_CSV = "CSV file must be UTF-8 encoded text"
+BULK_INSERT_REJECTED = "Batch rejected by the database, no rows were inserted"
@@ -1,31 +1,71 @@
 from fastapi import HTTPException, status
-from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from src.conf.config import settings
+from src.database.pool import InstrumentedQueuePool
+from src.services.profiler import install_query_profiler
 
 SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
+# Синхронний URI (psycopg2) лишається для alembic, застосунок працює через asyncpg
 URI = SQLALCHEMY_DATABASE_URL
-engine = create_engine(URI, echo=True)
+ASYNC_URI = make_url(URI).set(drivername='postgresql+asyncpg')
+engine = create_async_engine(
+    ASYNC_URI,
+    echo=settings.db_echo,
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
+install_query_profiler(engine)
 
-DBSession = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# expire_on_commit=False: після commit об'єкти серіалізуються без неявного lazy-load, неможливого в async
+DBSession = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+class LazySession:
+    """
+    Stand-in for an AsyncSession that creates the real session on first attribute access.
+    Requests that never touch the database (e.g. a cached user on /api/users/me/) neither
+    build a session nor check out a pooled connection.
+    """
+    __slots__ = ('_session',)
+
+    def __init__(self):
+        self._session = None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = DBSession()
+        return getattr(self._session, name)
+
+    async def rollback(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
 
 
 # Dependency
-def get_db():
+async def get_db():
     """
     The get_db function is a context manager that will automatically close the database session at the end of a request.
     It also handles any exceptions that occur during the request, rolling back any changes to the database if an exception occurs.
 
-    :return: A database connection from the pool
+    :return: A LazySession; the AsyncSession and its pooled connection are only acquired on first use
     :doc-author: Trelent
     """
-    db = DBSession()
+    db = LazySession()
     try:
         yield db
     except SQLAlchemyError as err:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
     finally:
-        db.close()
+        await db.close()
@@ -1,6 +1,6 @@
 import enum
 
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, func, Enum, ForeignKey, Float, Date, Numeric
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, func, Enum, ForeignKey, Float, Date, Numeric, Index
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -137,6 +137,11 @@ class User(Base):
 #
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index('ix_transactions_date_company_id', 'date', 'company_id'),
+        Index('ix_transactions_date_id', 'date', 'id'),
+        Index('ix_transactions_company_id_date_id', 'company_id', 'date', 'id'),
+    )
     id = Column(Integer, primary_key=True)
     date = Column(DateTime)
     expenses_category = Column(Enum("buyer", "capital", "fixed", "interest", "investments", "invoice_job", "old_debt",
@@ -160,6 +165,36 @@ class Transaction(Base):
     user = relationship('User', backref='transactions')
 
 
+class TransactionTurnover(Base):
+    __tablename__ = "transaction_turnover"
+    company_id = Column(Integer, ForeignKey('companies.id', ondelete='CASCADE'), primary_key=True)
+    currency = Column(Enum('tl', 'eur', 'usd', name='currency_type'), primary_key=True)
+    accounting_type = Column(Enum('GR Baris', 'ProOil', name='accounting_type'), primary_key=True)
+    expenses_category = Column(Enum("buyer", "capital", "fixed", "interest", "investments", "invoice_job", "old_debt",
+                                    "settlements", "variable", "other", name='expensestype'), primary_key=True)
+    debit_turnover_tl = Column(Float, nullable=False, default=0.0)
+    credit_turnover_tl = Column(Float, nullable=False, default=0.0)
+    debit_turnover_usd = Column(Float, nullable=False, default=0.0)
+    credit_turnover_usd = Column(Float, nullable=False, default=0.0)
+    transactions_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class TransactionTurnoverMonthly(Base):
+    __tablename__ = "transaction_turnover_monthly"
+    month = Column(Date, primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.id', ondelete='CASCADE'), primary_key=True)
+    currency = Column(Enum('tl', 'eur', 'usd', name='currency_type'), primary_key=True)
+    accounting_type = Column(Enum('GR Baris', 'ProOil', name='accounting_type'), primary_key=True)
+    expenses_category = Column(Enum("buyer", "capital", "fixed", "interest", "investments", "invoice_job", "old_debt",
+                                    "settlements", "variable", "other", name='expensestype'), primary_key=True)
+    debit_turnover_tl = Column(Float, nullable=False, default=0.0)
+    credit_turnover_tl = Column(Float, nullable=False, default=0.0)
+    debit_turnover_usd = Column(Float, nullable=False, default=0.0)
+    credit_turnover_usd = Column(Float, nullable=False, default=0.0)
+    transactions_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 
 class DailyStockReports(Base):
     __tablename__ = "DailyStockReports"
@@ -186,6 +221,10 @@ class Products(Base):
 
 class Purchase(Base):
     __tablename__ = "purchases"
+    __table_args__ = (
+        Index('ix_purchases_date_id', 'date', 'id'),
+        Index('ix_purchases_company_id_date_id', 'company_id', 'date', 'id'),
+    )
     id = Column(Integer, primary_key=True)
     date = Column(DateTime, nullable=False)
     operation_type = Column(Enum('income', 'outcome', name='operation_types'), nullable=False)
@@ -209,6 +248,25 @@ class Purchase(Base):
     user = relationship('User', backref='purchases')
 
 
+class PurchaseCosting(Base):
+    # Стан складу продукту після кожної закупівлі/відвантаження: ковзна середньозважена собівартість
+    __tablename__ = "purchase_costing"
+    __table_args__ = (
+        Index('ix_purchase_costing_product_id_date_purchase_id', 'product_id', 'date', 'purchase_id'),
+    )
+    purchase_id = Column(Integer, ForeignKey('purchases.id', ondelete='CASCADE'), primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    date = Column(DateTime, nullable=False)
+    quantity_on_hand = Column(Float, nullable=False)
+    avg_cost_tl = Column(Numeric(precision=18, scale=4), nullable=False)
+    avg_cost_usd = Column(Numeric(precision=18, scale=4), nullable=False)
+    value_tl = Column(Numeric(precision=18, scale=2), nullable=False)
+    value_usd = Column(Numeric(precision=18, scale=2), nullable=False)
+    cogs_tl = Column(Numeric(precision=18, scale=2), nullable=False, default=0)
+    cogs_usd = Column(Numeric(precision=18, scale=2), nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
 class ExchRate(Base):
     __tablename__ = "exchrates"
     id = Column(Integer, primary_key=True)
@@ -233,6 +291,14 @@ class AccountName(Base):
 
 class Movements(Base):
     __tablename__ = "movements"
+    __table_args__ = (
+        Index('ix_movements_date_id', 'date', 'id'),
+        Index('ix_movements_company_id_date_id', 'company_id', 'date', 'id'),
+        Index('ix_movements_payment_way_date', 'payment_way', 'date'),
+        Index('ix_movements_currency_date_id', 'currency', 'date', 'id'),
+        Index('ix_movements_account_type_operation_type_date_id', 'account_type', 'operation_type', 'date', 'id'),
+        Index('ix_movements_payment_way_currency_date_id', 'payment_way', 'currency', 'date', 'id'),
+    )
     id = Column(Integer, primary_key=True)
     date = Column(DateTime)
     company_id = Column('company_id', ForeignKey('companies.id', ondelete='SET NULL'), nullable=True)
@@ -249,6 +315,33 @@ class Movements(Base):
     user_id = Column('user_id', ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
     user = relationship('User', backref='movements')
 
+
+class MovementsDaily(Base):
+    # Денний куб рухів у розрізі всіх вимірів MovementsFilter; 0 у company_id/payment_way - значення відсутнє
+    __tablename__ = "movements_daily"
+    day = Column(Date, primary_key=True)
+    company_id = Column(Integer, primary_key=True)
+    payment_way = Column(Integer, primary_key=True)
+    currency = Column(String(50), primary_key=True)
+    account_type = Column(String(50), primary_key=True)
+    operation_type = Column(String(50), primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    movements_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class AccountBalanceMonthly(Base):
+    # Контрольна точка: обороти рахунку за місяць і залишок на кінець місяця (debit - credit наростаючим підсумком)
+    __tablename__ = "account_balance_monthly"
+    account_id = Column(Integer, ForeignKey('accounts.id', ondelete='CASCADE'), primary_key=True)
+    currency = Column(String(50), primary_key=True)
+    month = Column(Date, primary_key=True)
+    debit = Column(Float, nullable=False, default=0.0)
+    credit = Column(Float, nullable=False, default=0.0)
+    balance = Column(Float, nullable=False, default=0.0)
+    movements_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 # @event.listens_for(Company, 'before_insert')
 # def updated_favorite(mapper, conn, target):
 #
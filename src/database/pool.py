@@ -0,0 +1,69 @@
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that measures how long each checkout waits for a connection.
+    The wait includes opening a new connection when the pool grows into its overflow.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        except Exception:
+            # Відмова з'єднання, помилка автентифікації тощо - не вичерпаний пул
+            self.checkout_errors += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def recreate(self):
+        # pre-ping або invalidate пересоздають пул - лічильники переносимо в новий екземпляр
+        pool = super().recreate()
+        pool.checkouts = self.checkouts
+        pool.checkout_timeouts = self.checkout_timeouts
+        pool.checkout_errors = self.checkout_errors
+        pool.wait_total = self.wait_total
+        pool.wait_max = self.wait_max
+        return pool
+
+
+def pool_metrics(pool) -> dict:
+    """
+    The pool_metrics function collects the current state and checkout statistics of the connection pool.
+
+    :param pool: The engine pool, normally engine.pool
+    :return: A dict with PoolMetricsResponse fields
+    """
+    checkouts = getattr(pool, 'checkouts', 0)
+    wait_total = getattr(pool, 'wait_total', 0.0)
+    return {
+        'size': pool.size(),
+        'max_overflow': pool._max_overflow,
+        'in_use': pool.checkedout(),
+        'idle': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'checkouts': checkouts,
+        'checkout_timeouts': getattr(pool, 'checkout_timeouts', 0),
+        'checkout_errors': getattr(pool, 'checkout_errors', 0),
+        'checkout_wait_avg_ms': wait_total / checkouts * 1000 if checkouts else 0.0,
+        'checkout_wait_max_ms': getattr(pool, 'wait_max', 0.0) * 1000,
+    }
@@ -0,0 +1,186 @@
+from datetime import date, datetime, timedelta
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select, func, case, delete, update, text, union_all, literal, Date, cast
+from sqlalchemy.dialects.postgresql import insert
+
+from src.database.models import User, Movements, AccountBalanceMonthly
+
+BALANCE_KEYS = ('account_id', 'currency', 'month')
+BALANCE_COUNTERS = ('debit', 'credit', 'movements_count')
+# Простір ключів pg_advisory_xact_lock для контрольних точок залишків (другий ключ - account_id)
+BALANCE_LOCK_SPACE = 21
+
+
+def _value(value):
+    return getattr(value, 'value', value)
+
+
+def _month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def movement_amount(model=Movements):
+    # Знак руху для залишку рахунку: debit збільшує, credit зменшує
+    return case((model.operation_type == 'debit', model.sum),
+                (model.operation_type == 'credit', -model.sum), else_=0)
+
+
+def movement_delta(movement, sign: int = 1) -> dict | None:
+    """
+    The movement_delta function converts one movement into its contribution to the account balance checkpoints.
+    Call it with sign=-1 to get the contribution that has to be removed (delete or the old state on update).
+
+    :param movement: Movements or any object with the same attributes
+    :param sign: int: 1 to add the movement, -1 to subtract it
+    :return: A dict with the checkpoint key and counters, or None if the movement has no account or no date
+    """
+    if movement.payment_way is None or movement.date is None:
+        return None
+    operation = _value(movement.operation_type)
+    return {
+        'account_id': movement.payment_way,
+        'currency': _value(movement.currency),
+        'month': _month_start(movement.date),
+        'debit': sign * movement.sum if operation == 'debit' else 0.0,
+        'credit': sign * movement.sum if operation == 'credit' else 0.0,
+        'movements_count': sign,
+    }
+
+
+async def apply_balance_deltas(deltas: List[dict | None], db: AsyncSession) -> None:
+    """
+    The apply_balance_deltas function adds movement deltas to the monthly account balance checkpoints.
+    The month of the movement gets its turnover and closing balance adjusted, and the closing balance
+    of every later checkpoint of the same account and currency is shifted by the same amount.
+    Writers of one account are serialized with a transaction-level advisory lock.
+    It does not commit: the caller commits together with the movement rows.
+
+    :param deltas: List[dict]: Deltas produced by movement_delta
+    :param db: AsyncSession: The database session of the current request
+    :return: None
+    """
+    merged = {}
+    for delta in deltas:
+        if delta is None:
+            continue
+        key = tuple(delta[k] for k in BALANCE_KEYS)
+        if key not in merged:
+            merged[key] = dict(delta)
+            continue
+        for column in BALANCE_COUNTERS:
+            merged[key][column] += delta[column]
+    if not merged:
+        return
+
+    model = AccountBalanceMonthly
+    # Блокування беруться у сталому порядку, щоб паралельні запити не взаємоблокувались
+    for account_id in sorted({key[0] for key in merged}):
+        await db.execute(select(func.pg_advisory_xact_lock(BALANCE_LOCK_SPACE, account_id)))
+
+    for (account_id, currency, month), delta in sorted(merged.items()):
+        net = delta['debit'] - delta['credit']
+        if not net and not delta['movements_count']:
+            continue
+        same_series = and_(model.account_id == account_id, model.currency == currency)
+        opening = (
+            select(model.balance).where(same_series, model.month < month)
+            .order_by(model.month.desc()).limit(1).scalar_subquery()
+        )
+        stmt = insert(model).values(account_id=account_id, currency=currency, month=month,
+                                    debit=delta['debit'], credit=delta['credit'],
+                                    movements_count=delta['movements_count'],
+                                    balance=func.coalesce(opening, 0.0) + net)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(BALANCE_KEYS),
+            set_={column: getattr(model, column) + getattr(stmt.excluded, column) for column in BALANCE_COUNTERS}
+            | {'balance': model.balance + net, 'updated_at': func.now()},
+        )
+        await db.execute(stmt)
+        if net:
+            await db.execute(update(model).where(same_series, model.month > month)
+                             .values(balance=model.balance + net))
+        if delta['movements_count'] < 0:
+            # Порожній місяць не потрібен: залишок на його кінець дорівнює залишку попередньої точки
+            await db.execute(delete(model).where(same_series, model.month == month, model.movements_count <= 0))
+
+
+def live_balance_query():
+    # Контрольні точки з таблиці movements - джерело істини для rebuild
+    month = cast(func.date_trunc('month', Movements.date), Date).label('month')
+    monthly = (
+        select(Movements.payment_way.label('account_id'), Movements.currency.label('currency'), month,
+               func.sum(case((Movements.operation_type == 'debit', Movements.sum), else_=0)).label('debit'),
+               func.sum(case((Movements.operation_type == 'credit', Movements.sum), else_=0)).label('credit'),
+               func.count(Movements.id).label('movements_count'))
+        .where(Movements.payment_way.is_not(None), Movements.date.is_not(None))
+        .group_by(Movements.payment_way, Movements.currency, month)
+        .subquery()
+    )
+    balance = func.sum(monthly.c.debit - monthly.c.credit).over(
+        partition_by=(monthly.c.account_id, monthly.c.currency), order_by=monthly.c.month)
+    return select(*[monthly.c[column] for column in BALANCE_KEYS + BALANCE_COUNTERS], balance.label('balance'))
+
+
+async def rebuild_account_balances(current_user: User, db: AsyncSession) -> int:
+    """
+    The rebuild_account_balances function recomputes all balance checkpoints from the movements table.
+
+    :param current_user: User: The admin who requested the rebuild
+    :param db: AsyncSession: The database session
+    :return: The number of checkpoints written
+    """
+    await db.execute(text("LOCK TABLE account_balance_monthly IN SHARE ROW EXCLUSIVE MODE"))
+    await db.execute(delete(AccountBalanceMonthly))
+    await db.execute(insert(AccountBalanceMonthly).from_select(list(BALANCE_KEYS + BALANCE_COUNTERS) + ['balance'],
+                                                               live_balance_query()))
+    rows = await db.scalar(select(func.count()).select_from(AccountBalanceMonthly))
+    await db.commit()
+    return rows
+
+
+async def get_account_balance(account_id: int, as_of: date, current_user: User, db: AsyncSession,
+                              currency: str | None = None):
+    """
+    The get_account_balance function returns the balance of an account per currency at the end of the as_of day.
+    The closing balance of the last checkpoint before the month of as_of is read from account_balance_monthly,
+    and only the movements from the start of that month up to as_of are summed live through the
+    (payment_way, date) index, so the cost does not depend on the length of the account history.
+
+    :param account_id: int: Id of the payment account (AccountName)
+    :param as_of: date: Last day included in the balance
+    :param current_user: User: The user who requested the balance
+    :param db: AsyncSession: The database session
+    :param currency: str: Restrict the result to one currency
+    :return: Rows with currency and balance
+    """
+    if isinstance(as_of, datetime):
+        as_of = as_of.date()
+    month = _month_start(as_of)
+    model = AccountBalanceMonthly
+
+    snapshot = (
+        select(model.currency, model.balance)
+        .where(model.account_id == account_id, model.month < month)
+        .distinct(model.currency)
+        .order_by(model.currency, model.month.desc())
+    )
+    movements = (
+        select(Movements.currency, func.sum(movement_amount()).label('balance'))
+        .where(Movements.payment_way == account_id,
+               Movements.date >= month, Movements.date < as_of + timedelta(days=1))
+        .group_by(Movements.currency)
+    )
+    if currency is not None:
+        snapshot = snapshot.where(model.currency == _value(currency))
+        movements = movements.where(Movements.currency == _value(currency))
+
+    snapshot = snapshot.subquery()
+    combined = union_all(select(snapshot.c.currency, snapshot.c.balance), movements).subquery()
+    query = (
+        select(combined.c.currency, func.coalesce(func.sum(combined.c.balance), literal(0.0)).label('balance'))
+        .group_by(combined.c.currency)
+        .order_by(combined.c.currency)
+    )
+    return (await db.execute(query)).all()
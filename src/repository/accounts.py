@@ -4,30 +4,32 @@ import pathlib
 from datetime import date
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from sqlalchemy import and_, desc, asc, select, func, case, text, literal_column
 from src.conf.config import settings
 
 from src.database.models import User, UserRole, Products, Company, Purchase, Transaction, AccountName
+from src.repository.movements_cube import detach_reference
 from src.schemas import CurrencyType, OperationType, AccountsListResponse, AccountBase, AccountResponse, AccountCreateUpdate
 
 
-async def create_account(account: AccountCreateUpdate, current_user, db: Session) -> AccountResponse:
+async def create_account(account: AccountCreateUpdate, current_user, db: AsyncSession) -> AccountResponse:
     # Реалізація логіки для створення запису в базі даних
     db_account = AccountName(**account.dict())
     db.add(db_account)
-    db.commit()
-    db.refresh(db_account)
+    await db.commit()
+    await db.refresh(db_account)
     return db_account
 
 
-async def get_account(account_id: int, current_user, db: Session) -> AccountResponse:
+async def get_account(account_id: int, current_user, db: AsyncSession) -> AccountResponse:
     # Реалізація логіки для отримання одного запису з бази даних
-    db_account = db.query(AccountName).filter(AccountName.id == account_id).first()
+    db_account = await db.scalar(select(AccountName).where(AccountName.id == account_id))
     return db_account
 
 
-async def update_account(account_id: int, current_user, account_data, db: Session) -> AccountResponse:
+async def update_account(account_id: int, current_user, account_data, db: AsyncSession) -> AccountResponse:
     # Реалізація логіки для оновлення запису в базі даних
     db_account = await get_account(account_id, current_user, db)
     if db_account is None:
@@ -35,22 +37,24 @@ async def update_account(account_id: int, current_user, account_data, db: Sessio
 
     for key, value in account_data.dict().items():
         setattr(db_account, key, value)
-    db.commit()
-    db.refresh(db_account)
+    await db.commit()
+    await db.refresh(db_account)
     return db_account
 
 
-async def delete_account(account_id: int, current_user, db: Session) -> AccountResponse:
+async def delete_account(account_id: int, current_user, db: AsyncSession) -> AccountResponse:
     # Реалізація логіки для видалення запису з бази даних
     db_account = await get_account(account_id, current_user, db)
     if db_account is None:
         return None
-    db.delete(db_account)
-    db.commit()
+    await db.delete(db_account)
+    # Рухи рахунку лишаються з payment_way = NULL - куб переносить їх так само
+    await detach_reference('payment_way', account_id, db)
+    await db.commit()
     return db_account
 
 
-async def get_accounts(limit, offset, current_user, db: Session) -> AccountsListResponse:
+async def get_accounts(limit, offset, current_user, db: AsyncSession) -> AccountsListResponse:
     # Реалізація логіки для отримання всіх записів з бази даних
-    db_accounts = db.query(AccountName).offset(offset).limit(limit).all()
+    db_accounts = (await db.scalars(select(AccountName).offset(offset).limit(limit))).all()
     return db_accounts
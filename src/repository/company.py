@@ -2,7 +2,8 @@ from typing import List
 import os
 import pathlib
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from sqlalchemy import and_, desc, asc, select
 from src.conf.config import settings
 from dotenv import load_dotenv
@@ -11,27 +12,29 @@ load_dotenv()
 from src.database.models import User, UserRole, Products, Company
 from src.schemas import CompanyCreateUpdate, CompanyResponse, CompanyListResponse, CompanyDetailResponse, \
     PurchaseCreateUpdate, PurchaseCreate, PurchaseUpdate, PurchaseResponse, PurchaseListResponse
+from src.repository.movements_cube import detach_reference
+from src.services.response_cache import bump_version, TURNOVER_NAMESPACE
 
 
-async def get_company(db: Session, company_id: int):
-    db_company = db.query(Company).filter(Company.id == company_id).first()
+async def get_company(db: AsyncSession, company_id: int):
+    db_company = await db.scalar(select(Company).where(Company.id == company_id))
     return db_company
 
 
-async def get_companies(limit, offset, current_user, db: Session) -> List[CompanyListResponse] | None:
-    companies = db.query(Company).offset(offset).limit(limit).all()
+async def get_companies(limit, offset, current_user, db: AsyncSession) -> List[CompanyListResponse] | None:
+    companies = (await db.scalars(select(Company).offset(offset).limit(limit))).all()
     return companies
 
 
-async def create_company(company,  current_user, db: Session) -> CompanyResponse | None:
+async def create_company(company,  current_user, db: AsyncSession) -> CompanyResponse | None:
     db_company=Company(**company.dict())
     db.add(db_company)
-    db.commit()
-    db.refresh(db_company)
+    await db.commit()
+    await db.refresh(db_company)
     return db_company
 
 
-async def read_company(company_id, current_user, db: Session) -> CompanyDetailResponse | None:
+async def read_company(company_id, current_user, db: AsyncSession) -> CompanyDetailResponse | None:
     db_company = await get_company(db, company_id)
     if db_company:
         response = CompanyDetailResponse(
@@ -44,28 +47,32 @@ async def read_company(company_id, current_user, db: Session) -> CompanyDetailRe
     return None
 
 
-async def update_company(company_id, company: CompanyCreateUpdate, current_user, db: Session):
+async def update_company(company_id, company: CompanyCreateUpdate, current_user, db: AsyncSession):
     db_company = await get_company(db, company_id)
     if db_company is None:
         return None
     for key, value in company.dict().items():
         setattr(db_company, key, value)
-    db.commit()
-    db.refresh(db_company)
+    await db.commit()
+    await db.refresh(db_company)
     return db_company
 
 
-async def delete_company(company_id: int, db: Session):
+async def delete_company(company_id: int, db: AsyncSession):
     db_company = await get_company(db, company_id)
     if db_company is None:
         return None
-    db.delete(db_company)
-    db.commit()
+    await db.delete(db_company)
+    # Рухи компанії лишаються з company_id = NULL - куб переносить їх так само
+    await detach_reference('company_id', company_id, db)
+    await db.commit()
+    # Rollup-рядки компанії видаляються каскадом - кешовані звіти теж застаріли
+    await bump_version(TURNOVER_NAMESPACE)
     return db_company
 
 
 async def search_companies_by_name(company_name, current_user, db) -> List[CompanyDetailResponse]:
-    db_companies = db.query(Company).filter(
-            Company.company_name.ilike(f"%{company_name}%")).all()
+    db_companies = (await db.scalars(select(Company).where(
+            Company.company_name.ilike(f"%{company_name}%")))).all()
 
     return db_companies
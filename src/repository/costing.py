@@ -0,0 +1,213 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, delete, text
+from sqlalchemy.dialects.postgresql import insert
+
+from src.database.models import User, Purchase, PurchaseCosting
+
+ZERO = Decimal(0)
+COST_STEP = Decimal('0.0001')
+MONEY_STEP = Decimal('0.01')
+# Простір ключів pg_advisory_xact_lock для перерахунку собівартості (другий ключ - product_id)
+COSTING_LOCK_SPACE = 25
+INSERT_BATCH = 1000
+
+
+def _decimal(value) -> Decimal:
+    if value is None:
+        return ZERO
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _as_datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.combine(value, time.min)
+
+
+@dataclass
+class CostState:
+    """
+    Stock of one product after a purchase: quantity on hand, its value and the moving average cost per unit.
+    Values and averages are rounded to the precision of purchase_costing on every step, so continuing
+    from a stored row gives exactly the same result as replaying the whole history.
+    """
+    quantity: Decimal = ZERO
+    value_tl: Decimal = ZERO
+    value_usd: Decimal = ZERO
+    avg_cost_tl: Decimal = ZERO
+    avg_cost_usd: Decimal = ZERO
+
+    @classmethod
+    def from_row(cls, row: PurchaseCosting | None) -> 'CostState':
+        if row is None:
+            return cls()
+        return cls(_decimal(row.quantity_on_hand), _decimal(row.value_tl), _decimal(row.value_usd),
+                   _decimal(row.avg_cost_tl), _decimal(row.avg_cost_usd))
+
+    def apply(self, operation_type: str, quantity, sum_total_tl, sum_total_usd) -> tuple:
+        """
+        The apply method moves the state over one purchase.
+        An income adds its sum_total to the stock value and re-averages the cost;
+        an outcome leaves at the current average cost and does not change it.
+
+        :param operation_type: str: income or outcome
+        :param quantity: Quantity of the purchase
+        :param sum_total_tl: Total cost of an income in TL
+        :param sum_total_usd: Total cost of an income in USD
+        :return: A (cogs_tl, cogs_usd) tuple, the cost of goods leaving the stock (zero for an income)
+        """
+        quantity = _decimal(quantity)
+        if operation_type == 'income':
+            self.quantity += quantity
+            self.value_tl = (self.value_tl + _decimal(sum_total_tl)).quantize(MONEY_STEP)
+            self.value_usd = (self.value_usd + _decimal(sum_total_usd)).quantize(MONEY_STEP)
+            if self.quantity > 0:
+                self.avg_cost_tl = (self.value_tl / self.quantity).quantize(COST_STEP)
+                self.avg_cost_usd = (self.value_usd / self.quantity).quantize(COST_STEP)
+            return ZERO, ZERO
+
+        cogs_tl = (quantity * self.avg_cost_tl).quantize(MONEY_STEP)
+        cogs_usd = (quantity * self.avg_cost_usd).quantize(MONEY_STEP)
+        self.quantity -= quantity
+        if self.quantity > 0:
+            self.value_tl -= cogs_tl
+            self.value_usd -= cogs_usd
+        else:
+            # Склад вичерпано: залишок вартості від округлень не переноситься, від'ємний склад - за середньою
+            self.value_tl = (self.quantity * self.avg_cost_tl).quantize(MONEY_STEP)
+            self.value_usd = (self.quantity * self.avg_cost_usd).quantize(MONEY_STEP)
+        return cogs_tl, cogs_usd
+
+
+def touch(affected: Dict[int, datetime], purchase) -> None:
+    """
+    The touch function records that the costing of the purchase's product has to be recomputed from its date.
+    Call it with the old state before an update and with the new state after it.
+
+    :param affected: Dict[int, datetime]: Earliest changed date per product, updated in place
+    :param purchase: Purchase or any object with product_id and date
+    :return: None
+    """
+    if purchase.product_id is None or purchase.date is None:
+        return
+    since = _as_datetime(purchase.date)
+    current = affected.get(purchase.product_id)
+    affected[purchase.product_id] = since if current is None else min(current, since)
+
+
+async def _recompute_product(product_id: int, since: datetime | None, db: AsyncSession) -> int:
+    # Застарілі рядки від since видаляє викликач - до вставок по будь-якому з продуктів
+    previous = None
+    if since is not None:
+        previous = await db.scalar(
+            select(PurchaseCosting)
+            .where(PurchaseCosting.product_id == product_id, PurchaseCosting.date < since)
+            .order_by(PurchaseCosting.date.desc(), PurchaseCosting.purchase_id.desc())
+            .limit(1)
+        )
+    state = CostState.from_row(previous)
+
+    purchases = (
+        select(Purchase.id, Purchase.date, Purchase.operation_type, Purchase.quantity,
+               Purchase.sum_total_tl, Purchase.sum_total_usd)
+        .where(Purchase.product_id == product_id)
+        .order_by(Purchase.date, Purchase.id)
+    )
+    if since is not None:
+        purchases = purchases.where(Purchase.date >= since)
+
+    rows = []
+    written = 0
+    for purchase in await db.execute(purchases):
+        cogs_tl, cogs_usd = state.apply(purchase.operation_type, purchase.quantity,
+                                        purchase.sum_total_tl, purchase.sum_total_usd)
+        rows.append({
+            'purchase_id': purchase.id, 'product_id': product_id, 'date': purchase.date,
+            'quantity_on_hand': float(state.quantity),
+            'avg_cost_tl': state.avg_cost_tl, 'avg_cost_usd': state.avg_cost_usd,
+            'value_tl': state.value_tl, 'value_usd': state.value_usd,
+            'cogs_tl': cogs_tl, 'cogs_usd': cogs_usd,
+        })
+        if len(rows) >= INSERT_BATCH:
+            await db.execute(insert(PurchaseCosting).values(rows))
+            written += len(rows)
+            rows = []
+    if rows:
+        await db.execute(insert(PurchaseCosting).values(rows))
+        written += len(rows)
+    return written
+
+
+async def recompute_costing(affected: Dict[int, datetime], db: AsyncSession) -> None:
+    """
+    The recompute_costing function replays the purchases of each affected product from the changed date forward,
+    starting from the stored state of the last purchase before that date. Earlier rows are left untouched.
+    Recomputations of one product are serialized with a transaction-level advisory lock.
+    It flushes the session so pending purchase changes are visible, and does not commit.
+
+    :param affected: Dict[int, datetime]: Earliest changed date per product, filled by touch
+    :param db: AsyncSession: The database session of the current request
+    :return: None
+    """
+    if not affected:
+        return
+    await db.flush()
+    products = sorted(affected)
+    for product_id in products:
+        await db.execute(select(func.pg_advisory_xact_lock(COSTING_LOCK_SPACE, product_id)))
+    # Спершу видаляються застарілі рядки всіх продуктів: закупівля, перенесена на інший продукт,
+    # інакше отримала б новий рядок раніше, ніж зник її старий (purchase_id - первинний ключ)
+    for product_id in products:
+        await db.execute(delete(PurchaseCosting).where(PurchaseCosting.product_id == product_id,
+                                                       PurchaseCosting.date >= affected[product_id]))
+    for product_id in products:
+        await _recompute_product(product_id, affected[product_id], db)
+
+
+async def rebuild_costing(current_user: User, db: AsyncSession) -> int:
+    """
+    The rebuild_costing function recomputes purchase_costing for every product from the full purchase history.
+
+    :param current_user: User: The admin who requested the rebuild
+    :param db: AsyncSession: The database session
+    :return: The number of costing rows written
+    """
+    await db.execute(text("LOCK TABLE purchase_costing IN SHARE ROW EXCLUSIVE MODE"))
+    await db.execute(delete(PurchaseCosting))
+    product_ids = (await db.scalars(
+        select(Purchase.product_id).where(Purchase.product_id.is_not(None)).distinct()
+    )).all()
+    rows = 0
+    for product_id in sorted(product_ids):
+        rows += await _recompute_product(product_id, None, db)
+    await db.commit()
+    return rows
+
+
+async def get_valuation(as_of: date | None, product_id: int | None, current_user: User, db: AsyncSession) -> List:
+    """
+    The get_valuation function returns the stock valuation per product at the moving weighted-average cost.
+    The state after the last purchase of each product up to the end of the as_of day is read from
+    purchase_costing through the (product_id, date, purchase_id) index; without as_of the latest state is used.
+
+    :param as_of: date: Last day included in the valuation, None for the current state
+    :param product_id: int: Restrict the valuation to one product
+    :param current_user: User: The user who requested the valuation
+    :param db: AsyncSession: The database session
+    :return: Rows with product_id, quantity, average costs, values and the date of the last purchase
+    """
+    model = PurchaseCosting
+    query = (
+        select(model.product_id, model.quantity_on_hand.label('quantity'), model.avg_cost_tl, model.avg_cost_usd,
+               model.value_tl, model.value_usd, model.date.label('last_date'))
+        .distinct(model.product_id)
+        .order_by(model.product_id, model.date.desc(), model.purchase_id.desc())
+    )
+    if as_of is not None:
+        query = query.where(model.date < _as_datetime(as_of) + timedelta(days=1))
+    if product_id is not None:
+        query = query.where(model.product_id == product_id)
+    return (await db.execute(query)).all()
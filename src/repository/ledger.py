@@ -0,0 +1,82 @@
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select, func, case, literal, tuple_, union_all, String, cast
+
+from src.conf import messages
+from src.database.models import User, Transaction, Movements
+from src.services.pagination import encode_ledger_cursor, decode_ledger_cursor
+
+# Порядок джерел у межах одного дня: movement < transaction (як у ORDER BY source)
+LEDGER_SOURCES = {'movement': Movements, 'transaction': Transaction}
+
+
+def _branch(source: str, model, company_id: int, limit: int, position: Optional[Tuple]):
+    query = (
+        select(literal(source).label('source'), model.id, model.date, model.description,
+               cast(model.operation_type, String).label('operation_type'),
+               cast(model.currency, String).label('currency'), model.sum)
+        .where(model.company_id == company_id, model.date.is_not(None))
+    )
+    if position is not None:
+        last_date, last_source, last_id = position
+        # Seek по індексу (company_id, date, id) окремо в кожній таблиці
+        if source < last_source:
+            query = query.where(model.date > last_date)
+        elif source == last_source:
+            query = query.where(tuple_(model.date, model.id) > tuple_(last_date, last_id))
+        else:
+            query = query.where(model.date >= last_date)
+    # Жодне джерело не дасть у сторінку більше за limit рядків
+    return query.order_by(model.date, model.id).limit(limit).subquery()
+
+
+async def get_company_ledger(company_id: int, limit: int, current_user: User, db: AsyncSession,
+                             cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    The get_company_ledger function returns one page of the merged transactions and movements of a company,
+    ordered by (date, source, id), with the running balance (debit - credit) per currency.
+    Each table is read with a keyset seek limited to the page size, and the running balance is computed
+    by SUM() OVER over the page only; the balance reached before the page travels in the cursor.
+    A page deep in a long ledger therefore costs the same as the first one.
+    Rows without a date have no place in the ledger and are skipped.
+
+    :param company_id: int: Id of the company
+    :param limit: int: Page size
+    :param current_user: User: The user who requested the ledger
+    :param db: AsyncSession: The database session
+    :param cursor: str: Cursor of the last row of the previous page
+    :return: A (rows, next_cursor) tuple
+    """
+    position, opening = None, {}
+    if cursor is not None:
+        last_date, last_source, last_id, opening = decode_ledger_cursor(cursor)
+        if last_source not in LEDGER_SOURCES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_CURSOR)
+        position = (last_date, last_source, last_id)
+
+    merged = union_all(*[select(branch) for branch in (
+        _branch(source, model, company_id, limit, position) for source, model in LEDGER_SOURCES.items()
+    )]).subquery()
+    page = (
+        select(merged).order_by(merged.c.date, merged.c.source, merged.c.id).limit(limit).subquery()
+    )
+    amount = case((page.c.operation_type == 'debit', page.c.sum),
+                  (page.c.operation_type == 'credit', -page.c.sum), else_=0)
+    running = func.sum(amount).over(partition_by=page.c.currency,
+                                    order_by=(page.c.date, page.c.source, page.c.id))
+    query = select(page, running.label('balance')).order_by(page.c.date, page.c.source, page.c.id)
+
+    rows = []
+    balances = dict(opening)
+    for row in await db.execute(query):
+        entry = dict(row._mapping)
+        entry['balance'] += opening.get(entry['currency'], 0.0)
+        balances[entry['currency']] = entry['balance']
+        rows.append(entry)
+
+    if len(rows) < limit:
+        return rows, None
+    last = rows[-1]
+    return rows, encode_ledger_cursor(last['date'], last['source'], last['id'], balances)
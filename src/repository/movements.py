@@ -1,128 +1,202 @@
+from functools import lru_cache
 from typing import List
 import os
 import pathlib
 from datetime import date
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, desc, asc, select, func, case, text, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, desc, asc, select, func, case, text, literal_column, bindparam, tuple_, \
+    DateTime, Integer
 from src.conf.config import settings
 
 from src.database.models import User, UserRole, Products, Company, Purchase, Transaction, AccountName, Movements
+from src.repository import account_balance as repository_balance
+from src.repository import movements_cube as repository_cube
+from src.services.pagination import paginate, fetch_page, decode_cursor, total_count_column
 from src.schemas import CurrencyType, OperationType, MovementsResponse, MovementsBase, \
     MovementsListResponse, MovementsCreateUpdate, MovementsFilter
 
 
-async def create_movements(movements: MovementsCreateUpdate, current_user, db: Session) -> MovementsResponse:
+async def create_movements(movements: MovementsCreateUpdate, current_user, db: AsyncSession) -> MovementsResponse:
     # Реалізація логіки для створення запису в базі даних
     db_movements = Movements(**movements.dict())
     db.add(db_movements)
-    db.commit()
-    db.refresh(db_movements)
+    await repository_balance.apply_balance_deltas([repository_balance.movement_delta(db_movements)], db)
+    await repository_cube.apply_cube_deltas([repository_cube.movement_cube_delta(db_movements)], db)
+    await db.commit()
+    await db.refresh(db_movements)
     return db_movements
 
 
-async def get_movement(movement_id: int, current_user, db: Session) -> MovementsResponse:
+async def get_movement(movement_id: int, current_user, db: AsyncSession) -> MovementsResponse:
     # Реалізація логіки для отримання одного запису з бази даних
-    db_movement = db.query(Movements).filter(Movements.id == movement_id).first()
+    db_movement = await db.scalar(select(Movements).where(Movements.id == movement_id))
     return db_movement
 
 
-async def update_movements(movements_id: int, current_user, movements_data, db: Session) -> MovementsResponse:
+async def update_movements(movements_id: int, current_user, movements_data, db: AsyncSession) -> MovementsResponse:
     # Реалізація логіки для оновлення запису в базі даних
     db_movements = await get_movement(movements_id, current_user, db)
     if db_movements is None:
         return None
 
+    old_delta = repository_balance.movement_delta(db_movements, -1)
+    old_cube_delta = repository_cube.movement_cube_delta(db_movements, -1)
     for key, value in movements_data.dict().items():
         setattr(db_movements, key, value)
-    db.commit()
-    db.refresh(db_movements)
+    new_delta = repository_balance.movement_delta(db_movements)
+    new_cube_delta = repository_cube.movement_cube_delta(db_movements)
+    await repository_balance.apply_balance_deltas([old_delta, new_delta], db)
+    await repository_cube.apply_cube_deltas([old_cube_delta, new_cube_delta], db)
+    await db.commit()
+    await db.refresh(db_movements)
     return db_movements
 
 
-async def delete_movements(movements_id: int, current_user, db: Session) -> MovementsResponse:
+async def delete_movements(movements_id: int, current_user, db: AsyncSession) -> MovementsResponse:
     # Реалізація логіки для видалення запису з бази даних
     db_movements = await get_movement(movements_id, current_user, db)
     if db_movements is None:
         return None
-    db.delete(db_movements)
-    db.commit()
+    await db.delete(db_movements)
+    await repository_balance.apply_balance_deltas([repository_balance.movement_delta(db_movements, -1)], db)
+    await repository_cube.apply_cube_deltas([repository_cube.movement_cube_delta(db_movements, -1)], db)
+    await db.commit()
     return db_movements
 
 
-async def get_movements(limit, offset, current_user, db: Session) -> MovementsListResponse:
+async def get_movements(limit, offset, current_user, db: AsyncSession, cursor: str | None = None,
+                        columns: list | None = None) -> MovementsListResponse:
     # Реалізація логіки для отримання всіх записів з бази даних
-    db_movements = db.query(Movements).offset(offset).limit(limit).all()
+    db_movements = await fetch_page(db, paginate(select(Movements), Movements, limit, offset, cursor), columns)
     return db_movements
 
 
-async def get_movements_by_company(company_id: int, limit: int, offset: int, current_user: User, db: Session) \
+async def get_movements_by_company(company_id: int, limit: int, offset: int, current_user: User, db: AsyncSession,
+                                    cursor: str | None = None, columns: list | None = None) \
         -> MovementsListResponse:
-    return db.query(Movements).filter(
+    return await fetch_page(db, paginate(select(Movements).where(
         Movements.company_id == company_id,
-    ).offset(offset).limit(limit).all()
+    ), Movements, limit, offset, cursor), columns)
 
 
-async def get_movements_by_payment_way(payment_way_id: int, limit: int, offset: int, current_user: User, db: Session) \
+async def get_movements_by_payment_way(payment_way_id: int, limit: int, offset: int, current_user: User, db: AsyncSession,
+                                    cursor: str | None = None, columns: list | None = None) \
         -> MovementsListResponse:
-    return db.query(Movements).filter(
+    return await fetch_page(db, paginate(select(Movements).where(
         Movements.payment_way == payment_way_id,
-    ).offset(offset).limit(limit).all()
+    ), Movements, limit, offset, cursor), columns)
 
 
 async def get_movements_by_period(start_date: date, end_date: date, limit: int, offset: int, current_user: User,
-                                    db: Session) -> MovementsListResponse:
-    return db.query(Movements).filter(
+                                    db: AsyncSession, cursor: str | None = None,
+                                    columns: list | None = None) -> MovementsListResponse:
+    return await fetch_page(db, paginate(select(Movements).where(
         and_(
             Movements.date >= start_date,
             Movements.date <= end_date,
         )
-    ).offset(offset).limit(limit).all()
+    ), Movements, limit, offset, cursor), columns)
 
 
-async def get_movements_by_currency(currency: str, limit: int, offset: int, current_user: User, db: Session) \
-        -> MovementsListResponse:
-    return db.query(Movements).filter(
-        Movements.currency == currency,
-    ).offset(offset).limit(limit).all()
-
-
-async def get_filtered_movements(query_params: dict, limit: int, offset: int, current_user: User, db: Session):
-    # Початковий запит до бази даних
-    base_query = db.query(Movements)
-    print("!!!!!!!!!", query_params)
-    # Додаємо умови фільтрації до запиту за допомогою SQLAlchemy
-    filters = []
-
-    if 'start_date' in query_params and 'end_date' in query_params:
-        filters.append(and_(Movements.date >= query_params['start_date'], Movements.date <= query_params['end_date']))
-
-    if 'company_id' in query_params:
-        filters.append(Movements.company_id == query_params['company_id'])
-
-    if 'currency' in query_params:
-        filters.append(Movements.currency == query_params['currency'])
-
-    if 'payment_way' in query_params:
-        filters.append(Movements.payment_way == query_params['payment_way'])
+async def stream_movements_by_period(start_date: date, end_date: date, columns: List[str], current_user: User,
+                                     db: AsyncSession, batch_size: int = 1000):
+    # Серверний курсор: рядки читаються пачками по batch_size, без ORM-об'єктів
+    result = await db.stream(
+        select(*[getattr(Movements, column) for column in columns])
+        .where(Movements.date >= start_date, Movements.date <= end_date)
+        .order_by(Movements.date, Movements.id)
+        .execution_options(yield_per=batch_size)
+    )
+    return result.partitions()
 
-    if 'account_type' in query_params:
-        filters.append(Movements.account_type == query_params['account_type'])
 
-    if 'operation_type' in query_params:
-        filters.append(Movements.operation_type == query_params['operation_type'])
-
-    # Додайте інші умови фільтрації відповідно до вашого моделю та потреб
-
-    # Застосовуємо всі умови фільтрації
-    if filters:
-        base_query = base_query.filter(and_(*filters))
-
-    # Додаємо ліміт та офсет
-    base_query = base_query.limit(limit).offset(offset)
-
-    # Виконуємо запит та отримуємо результат
-    db_movements = base_query.all()
-
-    return db_movements
+async def get_movements_by_currency(currency: str, limit: int, offset: int, current_user: User, db: AsyncSession,
+                                    cursor: str | None = None, columns: list | None = None) \
+        -> MovementsListResponse:
+    return await fetch_page(db, paginate(select(Movements).where(
+        Movements.currency == currency,
+    ), Movements, limit, offset, cursor), columns)
+
+
+# Фільтри multi-filter: ключ query_params -> умова з bindparam того самого імені
+MOVEMENT_FILTERS = {
+    'company_id': lambda: Movements.company_id == bindparam('company_id'),
+    'currency': lambda: Movements.currency == bindparam('currency'),
+    'payment_way': lambda: Movements.payment_way == bindparam('payment_way'),
+    'account_type': lambda: Movements.account_type == bindparam('account_type'),
+    'operation_type': lambda: Movements.operation_type == bindparam('operation_type'),
+}
+
+
+@lru_cache(maxsize=256)
+def _filtered_movements_statement(filters: tuple, period: bool, cursor_kind: str | None, columns: tuple | None):
+    # Один Select на форму фільтра: значення йдуть через bindparam, тож ключ кешу
+    # скомпільованого SQL у SQLAlchemy однаковий і запит не будується й не компілюється повторно
+    query = select(*columns) if columns is not None else select(Movements)
+    conditions = [MOVEMENT_FILTERS[name]() for name in filters]
+    if period:
+        conditions += [Movements.date >= bindparam('start_date', type_=DateTime),
+                       Movements.date <= bindparam('end_date', type_=DateTime)]
+    if cursor_kind == 'dated':
+        conditions.append(tuple_(Movements.date, Movements.id)
+                          > tuple_(bindparam('last_date', type_=DateTime), bindparam('last_id', type_=Integer)))
+    elif cursor_kind == 'undated':
+        conditions += [Movements.date.is_(None), Movements.id > bindparam('last_id', type_=Integer)]
+    if conditions:
+        query = query.where(*conditions)
+    query = query.order_by(Movements.date, Movements.id).limit(bindparam('limit', type_=Integer))
+    if cursor_kind is None:
+        # Перша сторінка (або offset): COUNT(*) OVER() рахує всю вибірку в тому ж проході, що й сортування
+        query = query.add_columns(total_count_column()).offset(bindparam('offset', type_=Integer))
+    return query
+
+
+async def get_filtered_movements(query_params: dict, limit: int, offset: int, current_user: User, db: AsyncSession,
+                                 cursor: str | None = None, columns: list | None = None):
+    """
+    The get_filtered_movements function returns a page of movements matching any combination of MovementsFilter fields.
+    The statement is built once per filter shape (which filters are present, cursor or offset, columns)
+    and reused with new parameter values; composite indexes with (date, id) after the filter columns
+    serve both the filtering and the page order.
+    Without a cursor the page also carries the total number of matches via COUNT(*) OVER();
+    cursor pages are pure index seeks and return no total.
+
+    :param query_params: dict: Filters with MovementsFilter field names, None values already removed
+    :param limit: int: Page size
+    :param offset: int: Number of rows to skip when no cursor is given
+    :param current_user: User: The user who requested the movements
+    :param db: AsyncSession: The database session
+    :param cursor: str: Cursor of the last row of the previous page
+    :param columns: list: Explicit columns to select instead of the model (see src.services.fast_json)
+    :return: A (rows, total) tuple; total is None on cursor pages
+    """
+    filters = tuple(name for name in MOVEMENT_FILTERS if name in query_params)
+    period = 'start_date' in query_params and 'end_date' in query_params
+    params = {name: getattr(query_params[name], 'value', query_params[name]) for name in filters}
+    params['limit'] = limit
+    if period:
+        params['start_date'] = query_params['start_date']
+        params['end_date'] = query_params['end_date']
+
+    cursor_kind = None
+    if cursor is not None:
+        last_date, params['last_id'] = decode_cursor(cursor)
+        cursor_kind = 'undated' if last_date is None else 'dated'
+        if last_date is not None:
+            params['last_date'] = last_date
+    else:
+        params['offset'] = offset
+
+    statement = _filtered_movements_statement(filters, period, cursor_kind,
+                                              tuple(columns) if columns is not None else None)
+    rows = (await db.execute(statement, params)).all()
+
+    total = None
+    if cursor_kind is None:
+        total = rows[0][-1] if rows else (0 if offset == 0 else None)
+    if columns is None:
+        rows = [row[0] for row in rows]
+    return rows, total
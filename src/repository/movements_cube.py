@@ -0,0 +1,186 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case, delete, text, literal, tuple_, Date, cast
+from sqlalchemy.dialects.postgresql import insert
+
+from src.database.models import User, Movements, MovementsDaily
+
+CUBE_DIMENSIONS = ('company_id', 'payment_way', 'currency', 'account_type', 'operation_type')
+CUBE_KEYS = ('day',) + CUBE_DIMENSIONS
+CUBE_COUNTERS = ('total', 'movements_count')
+# Вимір без значення (рух без компанії чи рахунку) зберігається як 0: стовпці ключа не можуть бути NULL
+NO_REFERENCE = 0
+REFERENCE_DIMENSIONS = ('company_id', 'payment_way')
+
+
+def _value(value):
+    return getattr(value, 'value', value)
+
+
+def movement_cube_delta(movement, sign: int = 1) -> dict | None:
+    """
+    The movement_cube_delta function converts one movement into its contribution to the daily cube.
+    Call it with sign=-1 to get the contribution that has to be removed (delete or the old state on update).
+
+    :param movement: Movements or any object with the same attributes
+    :param sign: int: 1 to add the movement, -1 to subtract it
+    :return: A dict with the cube key and counters, or None if the movement has no date
+    """
+    if movement.date is None:
+        return None
+    day = movement.date.date() if isinstance(movement.date, datetime) else movement.date
+    delta = {key: _value(getattr(movement, key)) for key in CUBE_DIMENSIONS}
+    for key in REFERENCE_DIMENSIONS:
+        if delta[key] is None:
+            delta[key] = NO_REFERENCE
+    delta.update(day=day, total=sign * movement.sum, movements_count=sign)
+    return delta
+
+
+async def apply_cube_deltas(deltas: List[dict | None], db: AsyncSession) -> None:
+    """
+    The apply_cube_deltas function adds movement deltas to the movements_daily cube.
+    It does not commit: the caller commits together with the movement rows.
+
+    :param deltas: List[dict]: Deltas produced by movement_cube_delta
+    :param db: AsyncSession: The database session of the current request
+    :return: None
+    """
+    merged = {}
+    for delta in deltas:
+        if delta is None:
+            continue
+        key = tuple(delta[k] for k in CUBE_KEYS)
+        if key not in merged:
+            merged[key] = dict(delta)
+            continue
+        for column in CUBE_COUNTERS:
+            merged[key][column] += delta[column]
+    merged = {key: delta for key, delta in merged.items() if delta['total'] or delta['movements_count']}
+    if not merged:
+        return
+
+    model = MovementsDaily
+    stmt = insert(model).values(list(merged.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(CUBE_KEYS),
+        set_={column: getattr(model, column) + getattr(stmt.excluded, column)
+              for column in CUBE_COUNTERS} | {'updated_at': func.now()},
+    )
+    await db.execute(stmt)
+    shrunk = [key for key, delta in merged.items() if delta['movements_count'] < 0]
+    if shrunk:
+        # Порожня клітинка куба видаляється; перевіряються лише щойно змінені ключі
+        keys = tuple_(*[getattr(model, key) for key in CUBE_KEYS])
+        await db.execute(delete(model).where(keys.in_(shrunk), model.movements_count <= 0))
+
+
+async def detach_reference(dimension: str, reference_id: int, db: AsyncSession) -> None:
+    """
+    The detach_reference function moves the cube rows of a deleted company or account to NO_REFERENCE,
+    the same way the movements themselves get the reference set to NULL by the foreign key.
+    Call it in the transaction that deletes the company or the account.
+
+    :param dimension: str: company_id or payment_way
+    :param reference_id: int: Id of the deleted company or account
+    :param db: AsyncSession: The database session
+    :return: None
+    """
+    model = MovementsDaily
+    column = getattr(model, dimension)
+    keys = [literal(NO_REFERENCE).label(key) if key == dimension else getattr(model, key) for key in CUBE_KEYS]
+    grouped = [getattr(model, key) for key in CUBE_KEYS if key != dimension]
+    moved = (
+        select(*keys, *[func.sum(getattr(model, c)).label(c) for c in CUBE_COUNTERS])
+        .where(column == reference_id)
+        .group_by(*grouped)
+    )
+    stmt = insert(model).from_select(list(CUBE_KEYS + CUBE_COUNTERS), moved)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(CUBE_KEYS),
+        set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in CUBE_COUNTERS} | {'updated_at': func.now()},
+    )
+    await db.execute(stmt)
+    await db.execute(delete(model).where(column == reference_id))
+
+
+def live_cube_query():
+    # Куб з таблиці movements - джерело істини для rebuild
+    keys = [cast(Movements.date, Date).label('day')]
+    for key in CUBE_DIMENSIONS:
+        column = getattr(Movements, key)
+        keys.append(func.coalesce(column, NO_REFERENCE).label(key) if key in REFERENCE_DIMENSIONS else column)
+    return (
+        select(*keys, func.sum(Movements.sum).label('total'), func.count(Movements.id).label('movements_count'))
+        .where(Movements.date.is_not(None))
+        .group_by(*keys)
+    )
+
+
+async def rebuild_movements_cube(current_user: User, db: AsyncSession) -> int:
+    """
+    The rebuild_movements_cube function recomputes the movements_daily cube from the movements table.
+
+    :param current_user: User: The admin who requested the rebuild
+    :param db: AsyncSession: The database session
+    :return: The number of cube rows written
+    """
+    await db.execute(text("LOCK TABLE movements_daily IN SHARE ROW EXCLUSIVE MODE"))
+    await db.execute(delete(MovementsDaily))
+    await db.execute(insert(MovementsDaily).from_select(list(CUBE_KEYS + CUBE_COUNTERS), live_cube_query()))
+    rows = await db.scalar(select(func.count()).select_from(MovementsDaily))
+    await db.commit()
+    return rows
+
+
+async def aggregate_movements(dimensions: List[str], bucket: str | None, query_params: dict, current_user: User,
+                              db: AsyncSession):
+    """
+    The aggregate_movements function groups movements by the chosen dimensions and time bucket
+    and returns debit and credit sums with the number of movements.
+    It reads the movements_daily cube, whose grain is a day and every MovementsFilter dimension,
+    so any combination of dimensions and any bucket from a day up is answered without touching movements.
+    Movements without a date are not part of the cube.
+
+    :param dimensions: List[str]: Columns of CUBE_DIMENSIONS to group by
+    :param bucket: str: day, week, month or year; None aggregates over the whole period
+    :param query_params: dict: Filters with MovementsFilter field names, None values already removed
+    :param current_user: User: The user who requested the aggregation
+    :param db: AsyncSession: The database session
+    :return: A list of dicts with the requested dimensions, bucket, debit, credit and movements_count
+    """
+    model = MovementsDaily
+    keys = [getattr(model, dimension) for dimension in dimensions]
+    if bucket is not None:
+        keys.insert(0, cast(func.date_trunc(bucket, model.day), Date).label('bucket'))
+
+    filters = []
+    if 'start_date' in query_params:
+        filters.append(model.day >= query_params['start_date'])
+    if 'end_date' in query_params:
+        filters.append(model.day <= query_params['end_date'])
+    for dimension in CUBE_DIMENSIONS:
+        if dimension in query_params:
+            filters.append(getattr(model, dimension) == _value(query_params[dimension]))
+
+    query = (
+        select(*keys,
+               func.coalesce(func.sum(case((model.operation_type == 'debit', model.total), else_=0)), 0)
+               .label('debit'),
+               func.coalesce(func.sum(case((model.operation_type == 'credit', model.total), else_=0)), 0)
+               .label('credit'),
+               func.coalesce(func.sum(model.movements_count), 0).label('movements_count'))
+        .where(*filters)
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+    rows = []
+    for row in await db.execute(query):
+        entry = dict(row._mapping)
+        for key in REFERENCE_DIMENSIONS:
+            if entry.get(key) == NO_REFERENCE:
+                entry[key] = None
+        rows.append(entry)
+    return rows
@@ -2,8 +2,9 @@ from typing import List
 import os
 import pathlib
 
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, desc, asc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, desc, asc, select
 
 from src.conf.config import settings
 from dotenv import load_dotenv
@@ -11,18 +12,26 @@ from dotenv import load_dotenv
 load_dotenv()
 from src.database.models import User, UserRole, Products
 from src.schemas import ProductModel
+from src.services import product_names
+from src.services.etag import table_version
 
 
 async def get_products(
         current_user,
-        db: Session,
-        language: str,):
-
-    # Отримайте дані з бази даних за обраний період
-    query = db.query(Products)
-    products = query.all()
+        db: AsyncSession,
+        language: str,
+        version: str | None = None):
+
+    # Кеш назв прив'язаний до версії таблиці - тієї ж, з якої будується ETag
+    if version is None:
+        version = await table_version(Products, db)
+    names = product_names.list_names(language, version)
+    if names is None:
+        query = select(Products.id, product_names.name_column(language)).order_by(Products.id)
+        names = [tuple(row) for row in await db.execute(query)]
+        product_names.remember(language, version, names)
 
     # Створіть список об'єктів ProductModel
-    product_models = [ProductModel(id=product.id, name=getattr(product, language)) for product in products]
+    product_models = [ProductModel(id=product_id, name=name) for product_id, name in names]
 
     return product_models
@@ -3,74 +3,91 @@ import os
 import pathlib
 from datetime import date
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from sqlalchemy import and_, desc, asc, select
 from src.conf.config import settings
 from dotenv import load_dotenv
 
 load_dotenv()
 from src.database.models import User, UserRole, Products, Company, Purchase
+from src.repository import costing as repository_costing
+from src.services.pagination import paginate
 from src.schemas import CompanyCreateUpdate, CompanyResponse, CompanyListResponse, CompanyDetailResponse, \
     PurchaseCreate, PurchaseUpdate, PurchaseResponse, PurchaseListResponse
 
 
-async def create_purchase(purchase: PurchaseCreate, current_user, db: Session) -> PurchaseResponse:
+async def create_purchase(purchase: PurchaseCreate, current_user, db: AsyncSession) -> PurchaseResponse:
     # Реалізація логіки для створення запису в базі даних
     db_purchase = Purchase(**purchase.dict())
     db.add(db_purchase)
-    db.commit()
-    db.refresh(db_purchase)
+    affected = {}
+    repository_costing.touch(affected, db_purchase)
+    await repository_costing.recompute_costing(affected, db)
+    await db.commit()
+    await db.refresh(db_purchase)
     return db_purchase
 
 
-async def update_purchase(purchase_id: int, current_user, purchase_data, db: Session) -> PurchaseResponse:
+async def update_purchase(purchase_id: int, current_user, purchase_data, db: AsyncSession) -> PurchaseResponse:
     # Реалізація логіки для оновлення запису в базі даних
     db_purchase = await get_purchase(purchase_id, current_user, db)
     if db_purchase is None:
         return None
+    # Собівартість перераховується з ранішої з дат (стара/нова) для старого і нового продукту
+    affected = {}
+    repository_costing.touch(affected, db_purchase)
     for key, value in purchase_data.dict().items():
         setattr(db_purchase, key, value)
-    db.commit()
-    db.refresh(db_purchase)
+    repository_costing.touch(affected, db_purchase)
+    await repository_costing.recompute_costing(affected, db)
+    await db.commit()
+    await db.refresh(db_purchase)
     return db_purchase
 
 
-async def delete_purchase(purchase_id: int, current_user, db: Session) -> PurchaseResponse:
+async def delete_purchase(purchase_id: int, current_user, db: AsyncSession) -> PurchaseResponse:
     # Реалізація логіки для видалення запису з бази даних
     db_purchase = await get_purchase(purchase_id, current_user, db)
     if db_purchase is None:
         return None
-    db.delete(db_purchase)
-    db.commit()
+    await db.delete(db_purchase)
+    affected = {}
+    repository_costing.touch(affected, db_purchase)
+    await repository_costing.recompute_costing(affected, db)
+    await db.commit()
     return db_purchase
 
 
-async def get_purchase(purchase_id: int, current_user, db: Session) -> PurchaseResponse:
+async def get_purchase(purchase_id: int, current_user, db: AsyncSession) -> PurchaseResponse:
     # Реалізація логіки для отримання одного запису з бази даних
-    db_purchase = db.query(Purchase).filter(Purchase.id == purchase_id).first()
+    db_purchase = await db.scalar(select(Purchase).where(Purchase.id == purchase_id))
     return db_purchase
 
 
-async def get_purchases(limit, offset, current_user, db: Session) -> PurchaseListResponse:
+async def get_purchases(limit, offset, current_user, db: AsyncSession, cursor: str | None = None) -> PurchaseListResponse:
     # Реалізація логіки для отримання всіх записів з бази даних
-    db_purchase = db.query(Purchase).offset(offset).limit(limit).all()
+    db_purchase = (await db.scalars(paginate(select(Purchase), Purchase, limit, offset, cursor))).all()
     return db_purchase
 
 
-async def get_purchases_by_company(company_id: int, limit: int, offset: int, current_user: User, db: Session):
-    return db.query(Purchase).filter(
+async def get_purchases_by_company(company_id: int, limit: int, offset: int, current_user: User, db: AsyncSession,
+                                    cursor: str | None = None):
+    return (await db.scalars(paginate(select(Purchase).where(
         Purchase.company_id == company_id,
-    ).offset(offset).limit(limit).all()
+    ), Purchase, limit, offset, cursor))).all()
 
 
-async def get_purchases_by_product(product_id: int, limit: int, offset: int, current_user: User, db: Session):
-    return db.query(Purchase).filter(
+async def get_purchases_by_product(product_id: int, limit: int, offset: int, current_user: User, db: AsyncSession,
+                                    cursor: str | None = None):
+    return (await db.scalars(paginate(select(Purchase).where(
         Purchase.product_id == product_id,
-    ).offset(offset).limit(limit).all()
+    ), Purchase, limit, offset, cursor))).all()
 
 
-async def get_purchases_by_period(start_date: date, end_date: date, limit: int, offset: int, current_user: User, db: Session):
-    return db.query(Purchase).filter(
+async def get_purchases_by_period(start_date: date, end_date: date, limit: int, offset: int, current_user: User, db: AsyncSession,
+                                    cursor: str | None = None):
+    return (await db.scalars(paginate(select(Purchase).where(
         Purchase.date >= start_date,
         Purchase.date <= end_date,
-    ).offset(offset).limit(limit).all()
+    ), Purchase, limit, offset, cursor))).all()
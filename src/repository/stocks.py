@@ -2,8 +2,9 @@ from typing import List
 import os
 import pathlib
 
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, desc, asc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, desc, asc, select
 
 from src.conf.config import settings
 from dotenv import load_dotenv
@@ -11,6 +12,7 @@ from dotenv import load_dotenv
 load_dotenv()
 from src.database.models import User, UserRole, Products, DailyStockReports
 from src.schemas import ProductModel, DailyStockReportModel
+from src.services import product_names
 # from back.src.services.seeds.db_reader import get_daily_stock_reports
 
 
@@ -20,36 +22,38 @@ async def get_stocks_in_period(
         limit,
         offset,
         current_user,
-        db: Session,
+        db: AsyncSession,
         language: str,
         product_ids) -> List[DailyStockReportModel] | None:
 
-    # Отримайте дані з бази даних за обраний період
+    # Отримайте дані з бази даних за обраний період; назва продукту приходить з того ж join
     query = (
-        db.query(DailyStockReports)
+        select(DailyStockReports.id, DailyStockReports.date, DailyStockReports.quantity, DailyStockReports.product_id,
+               product_names.name_column(language).label('product_name'))
         .join(Products, Products.id == DailyStockReports.product_id)
-        .filter(and_(DailyStockReports.date.between(start_date, end_date)))
+        .where(and_(DailyStockReports.date.between(start_date, end_date)))
     )
     excluded_product_ids = [8, 11, 14, 15, 16]
     if product_ids:
-        query = query.filter(DailyStockReports.product_id.in_(product_ids))
+        query = query.where(DailyStockReports.product_id.in_(product_ids))
     else:
-        query = query.filter(~DailyStockReports.product_id.in_(excluded_product_ids))
+        query = query.where(~DailyStockReports.product_id.in_(excluded_product_ids))
 
-    daily_stock_reports = (
+    daily_stock_reports = (await db.execute(
         query
         .order_by(asc(DailyStockReports.date))
         .limit(limit)
         .offset(offset)
-        .all()
-    )
+    )).all()
 
-    # Перетворіть дані в об'єкти моделі
+    # Перетворіть дані в об'єкти моделі; одна ProductModel на продукт для всієї сторінки
+    products = {}
     stocks = []
     for stock in daily_stock_reports:
-        product_data = db.query(Products).filter(Products.id == stock.product_id).first()
-        product_model = ProductModel(id=stock.product_id, name=getattr(product_data, language))
-        stock_model = DailyStockReportModel(id=stock.id, date=stock.date, quantity=stock.quantity, product=product_model)
+        if stock.product_id not in products:
+            products[stock.product_id] = ProductModel(id=stock.product_id, name=stock.product_name)
+        stock_model = DailyStockReportModel(id=stock.id, date=stock.date, quantity=stock.quantity,
+                                            product=products[stock.product_id])
         stocks.append(stock_model)
 
     return stocks
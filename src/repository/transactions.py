@@ -1,30 +1,109 @@
-from typing import List
+from typing import Dict, List
 import os
 import pathlib
-from datetime import date
-
-from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, desc, asc, select, func, case, text, literal_column
+from datetime import date, datetime
+
+import asyncpg
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, desc, asc, select, func, case, text, literal_column, any_
+from src.conf import messages
 from src.conf.config import settings
 from dotenv import load_dotenv
 
 load_dotenv()
-from src.database.models import User, UserRole, Products, Company, Purchase, Transaction
+from src.database.models import User, UserRole, Products, Company, Purchase, Transaction, TransactionTurnover
+from src.repository import turnover as repository_turnover
+from src.services.pagination import paginate, fetch_page
+from src.services.response_cache import bump_version, TURNOVER_NAMESPACE
 from src.schemas import TransactionListResponse, TransactionResponse, TransactionCreateUpdate, TransactionBase, \
     CurrencyType, OperationRegion, DocumentType, OperationType, ExpensesType, TurnoverListResponse
 
 
-async def create_transaction(transaction: TransactionCreateUpdate, current_user, db: Session) -> TransactionResponse:
+async def create_transaction(transaction: TransactionCreateUpdate, current_user, db: AsyncSession) -> TransactionResponse:
     # Реалізація логіки для створення запису в базі даних
     db_transaction = Transaction(**transaction.dict())
     db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
+    await repository_turnover.apply_turnover_deltas([repository_turnover.transaction_delta(db_transaction)], db)
+    await db.commit()
+    await bump_version(TURNOVER_NAMESPACE)
+    await db.refresh(db_transaction)
     return db_transaction
 
 
-async def update_transaction(transaction_id: int, current_user, transaction_data, db: Session) -> TransactionResponse:
+# Значення enum accounting_type у БД; pydantic-схема приймає довільний рядок
+ACCOUNTING_TYPES = tuple(Transaction.__table__.c.accounting_type.type.enums)
+BULK_REFERENCES = {'company_id': Company, 'user_id': User}
+
+
+async def find_missing_references(transactions: List[TransactionCreateUpdate], db: AsyncSession) -> List[Dict]:
+    """
+    The find_missing_references function checks that every company_id and user_id of a batch exists.
+    Each referenced table is queried once with id = ANY(...) for the whole batch.
+
+    :param transactions: List[TransactionCreateUpdate]: Validated transactions
+    :param db: AsyncSession: The database session
+    :return: Per-row errors in the format of pydantic ValidationError.errors()
+    """
+    missing = {}
+    for field, model in BULK_REFERENCES.items():
+        ids = {getattr(transaction, field) for transaction in transactions}
+        found = set((await db.scalars(select(model.id).where(model.id == any_(list(ids))))).all())
+        missing[field] = ids - found
+
+    errors = []
+    for index, transaction in enumerate(transactions):
+        row_errors = [{"loc": (field,), "msg": f"{field} {getattr(transaction, field)} does not exist",
+                       "type": "value_error.missing_reference"}
+                      for field in BULK_REFERENCES if getattr(transaction, field) in missing[field]]
+        if row_errors:
+            errors.append({"row": index, "errors": row_errors})
+    return errors
+
+
+async def bulk_create_transactions(transactions: List[TransactionCreateUpdate], current_user, db: AsyncSession) -> int:
+    """
+    The bulk_create_transactions function inserts already validated transactions with a single COPY.
+    The rows and the turnover rollup deltas are committed in one database transaction.
+
+    :param transactions: List[TransactionCreateUpdate]: Validated transactions
+    :param current_user: User: The user who uploaded the batch
+    :param db: AsyncSession: The database session
+    :return: The number of inserted rows
+    """
+    if not transactions:
+        return 0
+    fields = list(TransactionCreateUpdate.__fields__)
+    # COPY оминає ORM-дефолти, тому службові дати заповнюємо явно
+    columns = fields + ['created_at', 'updated_at', 'deleted_at']
+    now = datetime.now()
+
+    records = []
+    for transaction in transactions:
+        values = {field: getattr(getattr(transaction, field), 'value', getattr(transaction, field)) for field in fields}
+        # asyncpg кодує timestamp лише з datetime
+        values['date'] = datetime.combine(values['date'], datetime.min.time())
+        records.append([values[field] for field in fields] + [now, now, now])
+
+    # Дельти rollup виконуються першими: вони відкривають транзакцію asyncpg, у якій далі йде COPY
+    await repository_turnover.apply_turnover_deltas(
+        [repository_turnover.transaction_delta(transaction) for transaction in transactions], db)
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    try:
+        await raw_connection.driver_connection.copy_records_to_table('transactions', records=records,
+                                                                     columns=columns)
+    except asyncpg.PostgresError:
+        # Пачку відхилила БД (обмеження, конкурентне видалення посилання): відкочуються й дельти rollup
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=messages.BULK_INSERT_REJECTED)
+    await db.commit()
+    await bump_version(TURNOVER_NAMESPACE)
+    return len(transactions)
+
+
+async def update_transaction(transaction_id: int, current_user, transaction_data, db: AsyncSession) -> TransactionResponse:
     # Реалізація логіки для оновлення запису в базі даних
     db_transaction = await get_transaction(transaction_id, current_user, db)
     if db_transaction is None:
@@ -32,50 +111,59 @@ async def update_transaction(transaction_id: int, current_user, transaction_data
     if transaction_data.expenses_category == 'other':
         transaction_data.expenses_category = ExpensesType.other
 
+    old_delta = repository_turnover.transaction_delta(db_transaction, -1)
     for key, value in transaction_data.dict().items():
         setattr(db_transaction, key, value)
-    db.commit()
-    db.refresh(db_transaction)
+    new_delta = repository_turnover.transaction_delta(db_transaction)
+    await repository_turnover.apply_turnover_deltas([old_delta, new_delta], db)
+    await db.commit()
+    await bump_version(TURNOVER_NAMESPACE)
+    await db.refresh(db_transaction)
     return db_transaction
 
 
-async def delete_transaction(transaction_id: int, current_user, db: Session) -> TransactionResponse:
+async def delete_transaction(transaction_id: int, current_user, db: AsyncSession) -> TransactionResponse:
     # Реалізація логіки для видалення запису з бази даних
     db_transaction = await get_transaction(transaction_id, current_user, db)
     if db_transaction is None:
         return None
-    db.delete(db_transaction)
-    db.commit()
+    await db.delete(db_transaction)
+    await repository_turnover.apply_turnover_deltas([repository_turnover.transaction_delta(db_transaction, -1)], db)
+    await db.commit()
+    await bump_version(TURNOVER_NAMESPACE)
     return db_transaction
 
 
-async def get_transaction(transaction_id: int, current_user, db: Session) -> TransactionResponse:
+async def get_transaction(transaction_id: int, current_user, db: AsyncSession) -> TransactionResponse:
     # Реалізація логіки для отримання одного запису з бази даних
-    db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
+    db_transaction = await db.scalar(select(Transaction).where(Transaction.id == transaction_id))
     return db_transaction
 
 
-async def get_transactions(limit, offset, current_user, db: Session) -> TransactionListResponse:
+async def get_transactions(limit, offset, current_user, db: AsyncSession, cursor: str | None = None,
+                           columns: list | None = None) -> TransactionListResponse:
     # Реалізація логіки для отримання всіх записів з бази даних
-    db_transaction = db.query(Transaction).offset(offset).limit(limit).all()
+    db_transaction = await fetch_page(db, paginate(select(Transaction), Transaction, limit, offset, cursor), columns)
     return db_transaction
 
 
-async def get_transaction_by_company(company_id: int, limit: int, offset: int, current_user: User, db: Session) \
+async def get_transaction_by_company(company_id: int, limit: int, offset: int, current_user: User, db: AsyncSession,
+                                    cursor: str | None = None, columns: list | None = None) \
         -> TransactionListResponse:
-    return db.query(Transaction).filter(
+    return await fetch_page(db, paginate(select(Transaction).where(
         Transaction.company_id == company_id,
-    ).offset(offset).limit(limit).all()
+    ), Transaction, limit, offset, cursor), columns)
 
 
 async def get_transaction_by_period(start_date: date, end_date: date, limit: int, offset: int, current_user: User,
-                                    db: Session) -> TransactionListResponse:
-    return db.query(Transaction).filter(
+                                    db: AsyncSession, cursor: str | None = None,
+                                    columns: list | None = None) -> TransactionListResponse:
+    return await fetch_page(db, paginate(select(Transaction).where(
         and_(
             Transaction.date >= start_date,
             Transaction.date <= end_date,
         )
-    ).offset(offset).limit(limit).all()
+    ), Transaction, limit, offset, cursor), columns)
 
     """
        SELECT
@@ -93,78 +181,42 @@ async def get_transaction_by_period(start_date: date, end_date: date, limit: int
 
 
 
-async def get_turnover_by_company(current_user: User, db: Session) -> TurnoverListResponse:
-    result = (
-        db.query(
-            Transaction.company_id,
-            Transaction.currency,
-            Transaction.accounting_type,
-            Transaction.expenses_category,
-            func.sum(
-                case((and_(Transaction.operation_type == 'debit', Transaction.currency == 'tl'), Transaction.sum),
-                     else_=0)).label('debit_turnover_tl'),
-            func.sum(
-                case((and_(Transaction.operation_type == 'credit', Transaction.currency == 'tl'), Transaction.sum),
-                     else_=0)).label('credit_turnover_tl'),
-            func.sum(
-                case((and_(Transaction.operation_type == 'debit', Transaction.currency == 'usd'), Transaction.sum),
-                     else_=0)).label('debit_turnover_usd'),
-            func.sum(case(
-                (and_(Transaction.operation_type == 'credit', Transaction.currency == 'usd'), Transaction.sum),
-                else_=0)).label('credit_turnover_usd')
+async def stream_transactions_by_period(start_date: date, end_date: date, columns: List[str], current_user: User,
+                                        db: AsyncSession, batch_size: int = 1000):
+    # Серверний курсор: рядки читаються пачками по batch_size, без ORM-об'єктів
+    result = await db.stream(
+        select(*[getattr(Transaction, column) for column in columns])
+        .where(Transaction.date >= start_date, Transaction.date <= end_date)
+        .order_by(Transaction.date, Transaction.id)
+        .execution_options(yield_per=batch_size)
+    )
+    return result.partitions()
+
+
+async def get_turnover_by_company(current_user: User, db: AsyncSession) -> TurnoverListResponse:
+    # Оберти читаються з rollup-таблиці transaction_turnover, яку ведуть create/update/delete_transaction
+    result = await db.execute(
+        select(
+            TransactionTurnover.company_id,
+            TransactionTurnover.currency,
+            TransactionTurnover.accounting_type,
+            TransactionTurnover.expenses_category,
+            TransactionTurnover.debit_turnover_tl,
+            TransactionTurnover.credit_turnover_tl,
+            TransactionTurnover.debit_turnover_usd,
+            TransactionTurnover.credit_turnover_usd,
         )
-        .group_by(Transaction.company_id, Transaction.currency, Transaction.accounting_type,
-                  Transaction.expenses_category)
-        .all()
     )
 
-    return result
+    return result.all()
 
 
 async def get_turnover_by_company_in_period(
     start_date: date,
     end_date: date,
     current_user: User,
-    db: Session,
+    db: AsyncSession,
 
 ) -> TurnoverListResponse:
-    result = (
-        db.query(
-            Transaction.company_id,
-            Transaction.currency,
-            Transaction.accounting_type,
-            Transaction.expenses_category,
-            func.sum(
-                case((and_(
-                    Transaction.operation_type == 'debit',
-                    Transaction.currency == 'tl',
-                    Transaction.date.between(start_date, end_date)
-                ), Transaction.sum), else_=0)
-            ).label('debit_turnover_tl'),
-            func.sum(
-                case((and_(
-                    Transaction.operation_type == 'credit',
-                    Transaction.currency == 'tl',
-                    Transaction.date.between(start_date, end_date)
-                ), Transaction.sum), else_=0)
-            ).label('credit_turnover_tl'),
-            func.sum(
-                case((and_(
-                    Transaction.operation_type == 'debit',
-                    Transaction.currency == 'usd',
-                    Transaction.date.between(start_date, end_date)
-                ), Transaction.sum), else_=0)
-            ).label('debit_turnover_usd'),
-            func.sum(
-                case((and_(
-                    Transaction.operation_type == 'credit',
-                    Transaction.currency == 'usd',
-                    Transaction.date.between(start_date, end_date)
-                ), Transaction.sum), else_=0)
-            ).label('credit_turnover_usd')
-        )
-        .group_by(Transaction.company_id, Transaction.currency, Transaction.accounting_type,
-                  Transaction.expenses_category)
-        .all()
-    )
-    return result
+    # Повні місяці беруться з transaction_turnover_monthly, крайові дні - з transactions по індексу (date, company_id)
+    return await repository_turnover.get_turnover_in_period(start_date, end_date, current_user, db)
@@ -0,0 +1,232 @@
+from datetime import date, datetime, timedelta
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select, func, case, delete, text, union_all, tuple_, Date, cast
+from sqlalchemy.dialects.postgresql import insert
+
+from src.database.models import User, Transaction, TransactionTurnover, TransactionTurnoverMonthly
+from src.services.response_cache import bump_version, TURNOVER_NAMESPACE
+
+TURNOVER_KEYS = ('company_id', 'currency', 'accounting_type', 'expenses_category')
+TURNOVER_SUMS = ('debit_turnover_tl', 'credit_turnover_tl', 'debit_turnover_usd', 'credit_turnover_usd')
+TURNOVER_COUNTERS = TURNOVER_SUMS + ('transactions_count',)
+
+
+def _value(value):
+    # Pydantic-схеми передають Enum-члени, у rollup потрібні рядкові значення
+    return getattr(value, 'value', value)
+
+
+def _month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def turnover_sums(model=Transaction) -> list:
+    """
+    The turnover_sums function builds the four labeled SUM(CASE ...) expressions of the turnover report.
+
+    :param model: Mapped class or alias that has operation_type, currency and sum columns
+    :return: A list of labeled aggregate expressions in TURNOVER_SUMS order
+    """
+    sums = []
+    for name in TURNOVER_SUMS:
+        operation, _, currency = name.split('_')
+        sums.append(func.sum(case((and_(model.operation_type == operation, model.currency == currency), model.sum),
+                                  else_=0)).label(name))
+    return sums
+
+
+def live_turnover_query(monthly: bool = False):
+    # Агрегат по таблиці transactions - джерело істини для rebuild/check
+    keys = [getattr(Transaction, key) for key in TURNOVER_KEYS]
+    if monthly:
+        keys.insert(0, cast(func.date_trunc('month', Transaction.date), Date).label('month'))
+    query = (
+        select(*keys, *turnover_sums(), func.count(Transaction.id).label('transactions_count'))
+        .where(Transaction.company_id.is_not(None))
+        .group_by(*keys)
+    )
+    if monthly:
+        query = query.where(Transaction.date.is_not(None))
+    return query
+
+
+def transaction_delta(transaction, sign: int = 1) -> dict | None:
+    """
+    The transaction_delta function converts one transaction into its contribution to the turnover rollups.
+    Call it with sign=-1 to get the contribution that has to be removed (delete or the old state on update).
+
+    :param transaction: Transaction or any object with the same attributes
+    :param sign: int: 1 to add the transaction, -1 to subtract it
+    :return: A dict with the month, rollup key columns, sums and transactions_count, or None if the row has no company
+    """
+    if transaction.company_id is None:
+        return None
+    delta = {key: _value(getattr(transaction, key)) for key in TURNOVER_KEYS}
+    delta.update(dict.fromkeys(TURNOVER_SUMS, 0.0))
+    column = f"{_value(transaction.operation_type)}_turnover_{_value(transaction.currency)}"
+    if column in delta:
+        delta[column] = sign * transaction.sum
+    delta['transactions_count'] = sign
+    delta['month'] = _month_start(transaction.date) if transaction.date is not None else None
+    return delta
+
+
+async def _upsert_deltas(model, key_columns: tuple, deltas: List[dict], db: AsyncSession) -> None:
+    merged = {}
+    for delta in deltas:
+        key = tuple(delta[k] for k in key_columns)
+        if key not in merged:
+            merged[key] = {column: delta[column] for column in key_columns + TURNOVER_COUNTERS}
+            continue
+        for column in TURNOVER_COUNTERS:
+            merged[key][column] += delta[column]
+    if not merged:
+        return
+
+    stmt = insert(model).values(list(merged.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={column: getattr(model, column) + getattr(stmt.excluded, column)
+              for column in TURNOVER_COUNTERS} | {'updated_at': func.now()},
+    )
+    await db.execute(stmt)
+    shrunk = [key for key, delta in merged.items() if delta['transactions_count'] < 0]
+    if shrunk:
+        # Група зникає з живого агрегату разом з останньою транзакцією; перевіряються лише змінені групи
+        keys = tuple_(*[getattr(model, column) for column in key_columns])
+        await db.execute(delete(model).where(keys.in_(shrunk), model.transactions_count <= 0))
+
+
+async def apply_turnover_deltas(deltas: List[dict | None], db: AsyncSession) -> None:
+    """
+    The apply_turnover_deltas function adds transaction deltas to the all-time and the monthly rollup tables.
+    It does not commit: the caller commits together with the transaction rows, so the rollups
+    can never diverge from the ledger.
+
+    :param deltas: List[dict]: Deltas produced by transaction_delta
+    :param db: AsyncSession: The database session of the current request
+    :return: None
+    """
+    deltas = [delta for delta in deltas if delta is not None]
+    await _upsert_deltas(TransactionTurnover, TURNOVER_KEYS, deltas, db)
+    await _upsert_deltas(TransactionTurnoverMonthly, ('month',) + TURNOVER_KEYS,
+                         [delta for delta in deltas if delta['month'] is not None], db)
+
+
+async def rebuild_turnover(current_user: User, db: AsyncSession) -> int:
+    """
+    The rebuild_turnover function recomputes both rollup tables from the transactions table.
+    The tables are locked against concurrent deltas for the duration of the rebuild.
+
+    :param current_user: User: The admin who requested the rebuild
+    :param db: AsyncSession: The database session
+    :return: The number of all-time rollup rows written
+    """
+    await db.execute(text("LOCK TABLE transaction_turnover, transaction_turnover_monthly IN SHARE ROW EXCLUSIVE MODE"))
+    await db.execute(delete(TransactionTurnover))
+    await db.execute(delete(TransactionTurnoverMonthly))
+    columns = list(TURNOVER_KEYS + TURNOVER_COUNTERS)
+    await db.execute(insert(TransactionTurnover).from_select(columns, live_turnover_query()))
+    await db.execute(insert(TransactionTurnoverMonthly).from_select(['month'] + columns,
+                                                                    live_turnover_query(monthly=True)))
+    rows = await db.scalar(select(func.count()).select_from(TransactionTurnover))
+    await db.commit()
+    await bump_version(TURNOVER_NAMESPACE)
+    return rows
+
+
+async def _compare(live_query, rollup_query, key_columns: tuple, db: AsyncSession, tolerance: float) -> List[dict]:
+    size = len(key_columns)
+    live = {tuple(row[:size]): row._mapping for row in await db.execute(live_query)}
+    rollup = {tuple(row[:size]): row._mapping for row in await db.execute(rollup_query)}
+
+    mismatches = []
+    for key in live.keys() | rollup.keys():
+        for column in TURNOVER_COUNTERS:
+            expected = (live[key][column] if key in live else 0) or 0
+            actual = (rollup[key][column] if key in rollup else 0) or 0
+            if abs(expected - actual) > tolerance:
+                mismatches.append({**dict(zip(key_columns, key)), 'field': column,
+                                   'expected': expected, 'actual': actual})
+    return mismatches
+
+
+async def check_turnover(current_user: User, db: AsyncSession, tolerance: float = 0.005) -> List[dict]:
+    """
+    The check_turnover function compares both rollup tables with the live aggregate over transactions.
+
+    :param current_user: User: The admin who requested the check
+    :param db: AsyncSession: The database session
+    :param tolerance: float: Maximum absolute difference accepted for float sums
+    :return: A list of mismatches, empty if the rollups are consistent
+    """
+    monthly_keys = ('month',) + TURNOVER_KEYS
+    return (
+        await _compare(live_turnover_query(),
+                       select(*[getattr(TransactionTurnover, c) for c in TURNOVER_KEYS + TURNOVER_COUNTERS]),
+                       TURNOVER_KEYS, db, tolerance)
+        + await _compare(live_turnover_query(monthly=True),
+                         select(*[getattr(TransactionTurnoverMonthly, c) for c in monthly_keys + TURNOVER_COUNTERS]),
+                         monthly_keys, db, tolerance)
+    )
+
+
+async def get_turnover_in_period(start_date: date, end_date: date, current_user: User, db: AsyncSession):
+    """
+    The get_turnover_in_period function returns turnover grouped by company for the closed range [start_date, end_date].
+    Months fully covered by the range are read from transaction_turnover_monthly; only the partial
+    edge days are aggregated live from transactions through the (date, company_id) index,
+    so the cost follows the length of the window, not the size of the ledger.
+
+    :param start_date: date: First day of the period
+    :param end_date: date: Last day of the period, inclusive
+    :param current_user: User: The user who requested the report
+    :param db: AsyncSession: The database session
+    :return: Rows with TurnoverResponse fields
+    """
+    if start_date > end_date:
+        return []
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    if isinstance(end_date, datetime):
+        end_date = end_date.date()
+    period_end = end_date + timedelta(days=1)
+
+    # [months_from, months_to) - повністю покриті місяці
+    months_from = start_date if start_date.day == 1 else _next_month(start_date)
+    months_to = _month_start(period_end)
+
+    parts = []
+    edges = []
+    if months_from < months_to:
+        monthly = TransactionTurnoverMonthly
+        parts.append(
+            select(*[getattr(monthly, c) for c in TURNOVER_KEYS + TURNOVER_SUMS])
+            .where(monthly.month >= months_from, monthly.month < months_to)
+        )
+        if start_date < months_from:
+            edges.append((start_date, months_from))
+        if months_to < period_end:
+            edges.append((months_to, period_end))
+    else:
+        edges.append((start_date, period_end))
+
+    if edges:
+        keys = [getattr(Transaction, key) for key in TURNOVER_KEYS]
+        parts.append(
+            select(*keys, *turnover_sums())
+            .where(Transaction.company_id.is_not(None),
+                   or_(*[and_(Transaction.date >= lower, Transaction.date < upper) for lower, upper in edges]))
+            .group_by(*keys)
+        )
+
+    combined = union_all(*parts).subquery() if len(parts) > 1 else parts[0].subquery()
+    keys = [combined.c[key] for key in TURNOVER_KEYS]
+    query = select(*keys, *[func.sum(combined.c[column]).label(column) for column in TURNOVER_SUMS]).group_by(*keys)
+    return (await db.execute(query)).all()
@@ -1,19 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, status, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
+from typing import Optional
 
 from src.conf import messages
 from src.database.db import get_db
 from src.database.models import User, UserRole, AccountName
 from src.repository import accounts as repository_accounts
-from src.schemas import AccountBase, AccountResponse, AccountCreateUpdate, AccountsListResponse
+from src.repository import account_balance as repository_balance
+from src.schemas import AccountBase, AccountResponse, AccountCreateUpdate, AccountsListResponse, \
+    AccountBalanceListResponse, CurrencyType
 from src.services.auth.auth import auth_service
 from src.services.auth.role import RoleAccess
+from src.services.etag import conditional_get
+from src.services.rate_limit import RateLimiter
+from src.services.timing import TimedRoute
 
-router = APIRouter(prefix='/accounts', tags=["accounts"])
+router = APIRouter(prefix='/accounts', tags=["accounts"], route_class=TimedRoute)
 
 allowed_get_accounts = RoleAccess([UserRole.admin, UserRole.user])  # noqa
+allowed_rebuild_balances = RoleAccess([UserRole.admin])  # noqa
 
 
 
@@ -21,7 +27,7 @@ allowed_get_accounts = RoleAccess([UserRole.admin, UserRole.user])  # noqa
              dependencies=[Depends(allowed_get_accounts), Depends(RateLimiter(times=10, seconds=60))])
 async def create_accounts(accounts_data: AccountCreateUpdate,
                                    current_user: User = Depends(auth_service.get_current_user),
-                                   db: Session = Depends(get_db)
+                                   db: AsyncSession = Depends(get_db)
                                    ):
     return await repository_accounts.create_account(accounts_data, current_user, db)
 
@@ -29,7 +35,7 @@ async def create_accounts(accounts_data: AccountCreateUpdate,
 @router.get("/{movements_id}", response_model=AccountResponse, status_code=status.HTTP_200_OK,
             dependencies=[Depends(allowed_get_accounts), Depends(RateLimiter(times=10, seconds=60))])
 async def read_account(account_id: int, current_user: User = Depends(auth_service.get_current_user),
-                        db: Session = Depends(get_db)):
+                        db: AsyncSession = Depends(get_db)):
     db_accounts = await repository_accounts.get_account(account_id, current_user, db)
 
     if db_accounts is None:
@@ -43,7 +49,7 @@ async def update_account(
     account_id: int,
     account_data: AccountCreateUpdate,
     current_user: User = Depends(auth_service.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> AccountResponse:
     # Реалізація логіки для оновлення запису в базі даних
     db_accounts = await repository_accounts.update_account(account_id, current_user, account_data, db)
@@ -57,7 +63,7 @@ async def update_account(
                dependencies=[Depends(allowed_get_accounts), Depends(RateLimiter(times=10, seconds=60))])
 async def delete_account(account_id: int,
                                    current_user: User = Depends(auth_service.get_current_user),
-                                   db: Session = Depends(get_db)
+                                   db: AsyncSession = Depends(get_db)
                                    ):
     db_accounts = await repository_accounts.delete_account(account_id, current_user, db)
     if db_accounts is None:
@@ -73,10 +79,42 @@ async def delete_account(account_id: int,
                           Depends(RateLimiter(times=10, seconds=60))]
             )
 async def read_accounts(
+        request: Request,
+        response: Response,
         offset: int = 0,
         limit: int = 100,
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
+    not_modified = await conditional_get(request, response, AccountName, db, offset, limit)
+    if not_modified:
+        return not_modified
     db_accounts = await repository_accounts.get_accounts(limit, offset, current_user, db)
     return {"items": db_accounts}
+
+
+@router.get("/{account_id}/balance", response_model=AccountBalanceListResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_get_accounts), Depends(RateLimiter(times=10, seconds=60))])
+async def read_account_balance(
+        account_id: int,
+        as_of: Optional[date] = None,
+        currency: Optional[CurrencyType] = None,
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    # Залишок = контрольна точка на кінець попереднього місяця + рухи з початку місяця до as_of
+    if await repository_accounts.get_account(account_id, current_user, db) is None:
+        raise HTTPException(status_code=404, detail=messages.NOT_FOUND)
+    as_of = as_of or date.today()
+    balances = await repository_balance.get_account_balance(account_id, as_of, current_user, db, currency)
+    return {"account_id": account_id, "as_of": as_of, "items": balances}
+
+
+@router.post("/balance/rebuild", status_code=status.HTTP_200_OK,
+             dependencies=[Depends(allowed_rebuild_balances), Depends(RateLimiter(times=10, seconds=60))])
+async def rebuild_account_balances(
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    rows = await repository_balance.rebuild_account_balances(current_user, db)
+    return {"status": "success", "message": "Account balances rebuilt successfully", "rows": rows}
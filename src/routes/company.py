@@ -1,15 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, status, Request, Response, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.conf import messages
 from src.database.db import get_db
-from src.database.models import User, UserRole
+from src.database.models import User, UserRole, Company
 from src.repository import company as repository_company
-from src.schemas import CompanyCreateUpdate, CompanyResponse, CompanyListResponse, CompanyDetailResponse
+from src.repository import ledger as repository_ledger
+from src.schemas import CompanyCreateUpdate, CompanyResponse, CompanyListResponse, CompanyDetailResponse, \
+    LedgerResponse
 from src.services.auth.auth import auth_service
 from src.services.auth.role import RoleAccess
+from src.services.etag import conditional_get
+from src.services.rate_limit import RateLimiter
+from src.services.timing import TimedRoute
 
-router = APIRouter(prefix='/company', tags=["company"])
+router = APIRouter(prefix='/company', tags=["company"], route_class=TimedRoute)
 
 allowed_get_company = RoleAccess([UserRole.admin, UserRole.user])  # noqa
 
@@ -18,11 +24,16 @@ allowed_get_company = RoleAccess([UserRole.admin, UserRole.user])  # noqa
             status_code=status.HTTP_200_OK,
             dependencies=[Depends(allowed_get_company), Depends(RateLimiter(times=10, seconds=60))])
 async def read_companies(
+        request: Request,
+        response: Response,
         offset: int = 0,
         limit: int = 600,
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
+    not_modified = await conditional_get(request, response, Company, db, offset, limit)
+    if not_modified:
+        return not_modified
     companies = await repository_company.get_companies(limit, offset, current_user, db)
 
     if companies is None:
@@ -34,7 +45,7 @@ async def read_companies(
 @router.post("/", response_model=CompanyResponse, status_code=status.HTTP_201_CREATED,
              dependencies=[Depends(allowed_get_company), Depends(RateLimiter(times=10, seconds=60))])
 async def create_company(company: CompanyCreateUpdate, current_user: User = Depends(auth_service.get_current_user),
-                         db: Session = Depends(get_db)):
+                         db: AsyncSession = Depends(get_db)):
     db_company = await repository_company.create_company(company, current_user, db)
     return db_company
 
@@ -42,7 +53,7 @@ async def create_company(company: CompanyCreateUpdate, current_user: User = Depe
 @router.get("/{company_id}", response_model=CompanyResponse, status_code=status.HTTP_200_OK,
             dependencies=[Depends(allowed_get_company), Depends(RateLimiter(times=10, seconds=60))])
 async def read_company(company_id: int, current_user: User = Depends(auth_service.get_current_user),
-                       db: Session = Depends(get_db)):
+                       db: AsyncSession = Depends(get_db)):
     db_company = await repository_company.read_company(company_id, current_user, db)
 
     if db_company is None:
@@ -54,7 +65,7 @@ async def read_company(company_id: int, current_user: User = Depends(auth_servic
             dependencies=[Depends(allowed_get_company), Depends(RateLimiter(times=10, seconds=60))])
 async def update_company(company_id: int, company: CompanyCreateUpdate,
                          current_user: User = Depends(auth_service.get_current_user),
-                         db: Session = Depends(get_db)):
+                         db: AsyncSession = Depends(get_db)):
     db_company = await repository_company.update_company(company_id, company, current_user, db)
     if db_company is None:
         raise HTTPException(status_code=404, detail=messages.NOT_FOUND)
@@ -65,7 +76,7 @@ async def update_company(company_id: int, company: CompanyCreateUpdate,
                # status_code=status.HTTP_204_NO_CONTENT,
                dependencies=[Depends(allowed_get_company), Depends(RateLimiter(times=10, seconds=60))])
 async def delete_company(company_id: int, current_user: User = Depends(auth_service.get_current_user),
-                         db: Session = Depends(get_db)):
+                         db: AsyncSession = Depends(get_db)):
     db_company = await repository_company.delete_company(company_id, db)
     if db_company is None:
         raise HTTPException(status_code=404, detail=messages.NOT_FOUND)
@@ -77,6 +88,20 @@ async def delete_company(company_id: int, current_user: User = Depends(auth_serv
 async def search_companies_by_name(
         company_name: str,
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)):
+        db: AsyncSession = Depends(get_db)):
     companies = await repository_company.search_companies_by_name(company_name, current_user, db)
     return {"items": companies}
+
+
+@router.get("/{company_id}/ledger", response_model=LedgerResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_get_company), Depends(RateLimiter(times=10, seconds=60))])
+async def read_company_ledger(
+        company_id: int,
+        limit: int = Query(500, ge=1, le=5000),
+        cursor: Optional[str] = None,
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    # Транзакції та рухи компанії однією стрічкою з наростаючим залишком по валютах
+    rows, cursor = await repository_ledger.get_company_ledger(company_id, limit, current_user, db, cursor)
+    return {"company_id": company_id, "items": rows, "next_cursor": cursor}
@@ -0,0 +1,70 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, status
+
+from src.database.db import engine
+from src.database.models import User, UserRole
+from src.database.pool import pool_metrics
+from src.schemas import PoolMetricsResponse, RouteLatencyResponse, PasswordHashingMetricsResponse, \
+    RedisMetricsResponse
+from src.services.auth.auth import auth_service
+from src.services.auth.password import password_hasher
+from src.services.auth.role import RoleAccess
+from src.services.redis_pool import redis_manager
+from src.services.timing import TimedRoute, latency_summary
+
+router = APIRouter(prefix='/metrics', tags=["metrics"], route_class=TimedRoute)
+
+allowed_get_metrics = RoleAccess([UserRole.admin])  # noqa
+
+
+@router.get("/db_pool", response_model=PoolMetricsResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_get_metrics)])
+async def get_db_pool_metrics(current_user: User = Depends(auth_service.get_current_user)):
+    """
+    The get_db_pool_metrics function returns the state of the database connection pool:
+    connections in use and idle, overflow, and how long requests waited for a connection.
+
+    :param current_user: User: The admin who requested the metrics
+    :return: Pool metrics
+    """
+    return pool_metrics(engine.pool)
+
+
+@router.get("/latency", response_model=List[RouteLatencyResponse], status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_get_metrics)])
+async def get_route_latency(current_user: User = Depends(auth_service.get_current_user)):
+    """
+    The get_route_latency function returns request latency percentiles (p50/p95/p99) per route
+    collected by this process since it started.
+
+    :param current_user: User: The admin who requested the metrics
+    :return: Latency per route, slowest p99 first
+    """
+    return latency_summary()
+
+
+@router.get("/password_hashing", response_model=PasswordHashingMetricsResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_get_metrics)])
+async def get_password_hashing_metrics(current_user: User = Depends(auth_service.get_current_user)):
+    """
+    The get_password_hashing_metrics function returns the state of the bcrypt thread pool:
+    how many hashes are queued, running and done, and how long one takes at the configured cost.
+
+    :param current_user: User: The admin who requested the metrics
+    :return: Password hashing metrics
+    """
+    return password_hasher.metrics()
+
+
+@router.get("/redis", response_model=RedisMetricsResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_get_metrics)])
+async def get_redis_metrics(current_user: User = Depends(auth_service.get_current_user)):
+    """
+    The get_redis_metrics function returns Redis command throughput and latency
+    and the saturation of the shared connection pool.
+
+    :param current_user: User: The admin who requested the metrics
+    :return: Redis metrics
+    """
+    return redis_manager.metrics()
@@ -1,26 +1,34 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
+from typing import List, Optional
 
 from src.conf import messages
 from src.database.db import get_db
 from src.database.models import User, UserRole, Movements
 from src.repository import movements as repository_movements
-from src.schemas import MovementsBase, MovementsCreateUpdate, MovementsResponse, MovementsListResponse, MovementsFilter
+from src.repository import movements_cube as repository_cube
+from src.schemas import MovementsBase, MovementsCreateUpdate, MovementsResponse, MovementsListResponse, MovementsFilter, \
+    ExportFormat, AggregateDimension, TimeBucket, MovementsAggregateResponse
 from src.services.auth.auth import auth_service
+from src.services.fast_json import list_columns, list_response
+from src.services.export import export_rows, EXPORT_MEDIA_TYPES
 from src.services.auth.role import RoleAccess
+from src.services.rate_limit import RateLimiter
+from src.services.timing import TimedRoute
 
-router = APIRouter(prefix='/movements', tags=["movements"])
+router = APIRouter(prefix='/movements', tags=["movements"], route_class=TimedRoute)
 
 allowed_get_movements = RoleAccess([UserRole.admin, UserRole.user])  # noqa
+allowed_rebuild_cube = RoleAccess([UserRole.admin])  # noqa
 
 
 @router.post("/", response_model=MovementsResponse, status_code=status.HTTP_201_CREATED,
              dependencies=[Depends(allowed_get_movements), Depends(RateLimiter(times=10, seconds=60))])
 async def create_movements(movements_data: MovementsCreateUpdate,
                                    current_user: User = Depends(auth_service.get_current_user),
-                                   db: Session = Depends(get_db)
+                                   db: AsyncSession = Depends(get_db)
                                    ):
     return await repository_movements.create_movements(movements_data, current_user, db)
 
@@ -28,7 +36,7 @@ async def create_movements(movements_data: MovementsCreateUpdate,
 @router.get("/{movements_id}", response_model=MovementsResponse, status_code=status.HTTP_200_OK,
             dependencies=[Depends(allowed_get_movements), Depends(RateLimiter(times=10, seconds=60))])
 async def read_movement(movements_id: int, current_user: User = Depends(auth_service.get_current_user),
-                        db: Session = Depends(get_db)):
+                        db: AsyncSession = Depends(get_db)):
     db_movements = await repository_movements.get_movement(movements_id, current_user, db)
 
     if db_movements is None:
@@ -42,7 +50,7 @@ async def update_movements(
     movements_id: int,
     movements_data: MovementsCreateUpdate,
     current_user: User = Depends(auth_service.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> MovementsResponse:
     # Реалізація логіки для оновлення запису в базі даних
     db_movements = await repository_movements.update_movements(movements_id, current_user, movements_data, db)
@@ -56,7 +64,7 @@ async def update_movements(
                dependencies=[Depends(allowed_get_movements), Depends(RateLimiter(times=10, seconds=60))])
 async def delete_movements(movements_id: int,
                                    current_user: User = Depends(auth_service.get_current_user),
-                                   db: Session = Depends(get_db)
+                                   db: AsyncSession = Depends(get_db)
                                    ):
     db_movements = await repository_movements.delete_movements(movements_id, current_user, db)
     if db_movements is None:
@@ -74,11 +82,14 @@ async def delete_movements(movements_id: int,
 async def read_movements(
         offset: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
+        fast: bool = Query(False, description="Skip validation and encode rows with orjson"),
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_movements = await repository_movements.get_movements(limit, offset, current_user, db)
-    return {"items": db_movements}
+    columns = list_columns(MovementsResponse, Movements, fast)
+    db_movements = await repository_movements.get_movements(limit, offset, current_user, db, cursor, columns)
+    return list_response(db_movements, limit, cursor, fast)
 
 
 
@@ -88,11 +99,14 @@ async def read_movements_by_company(
         company_id: int,
         offset: int = 0,
         limit: int = 2000,
+        cursor: Optional[str] = None,
+        fast: bool = Query(False, description="Skip validation and encode rows with orjson"),
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_movements = await repository_movements.get_movements_by_company(company_id, limit, offset, current_user, db)
-    return {"items": db_movements}
+    columns = list_columns(MovementsResponse, Movements, fast)
+    db_movements = await repository_movements.get_movements_by_company(company_id, limit, offset, current_user, db, cursor, columns)
+    return list_response(db_movements, limit, cursor, fast)
 
 
 @router.get("/by_payment_way/{payment_way_id}", response_model=MovementsListResponse, status_code=status.HTTP_200_OK,
@@ -101,11 +115,14 @@ async def read_movements_by_payment_way(
         payment_way_id: int,
         offset: int = 0,
         limit: int = 2000,
+        cursor: Optional[str] = None,
+        fast: bool = Query(False, description="Skip validation and encode rows with orjson"),
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_movements = await repository_movements.get_movements_by_payment_way(payment_way_id, limit, offset, current_user, db)
-    return {"items": db_movements}
+    columns = list_columns(MovementsResponse, Movements, fast)
+    db_movements = await repository_movements.get_movements_by_payment_way(payment_way_id, limit, offset, current_user, db, cursor, columns)
+    return list_response(db_movements, limit, cursor, fast)
 
 
 @router.post("/by_period", response_model=MovementsListResponse, status_code=status.HTTP_200_OK,
@@ -115,11 +132,14 @@ async def read_movements_by_period(
         end_date: date,
         offset: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
+        fast: bool = Query(False, description="Skip validation and encode rows with orjson"),
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_movements = await repository_movements.get_movements_by_period(start_date, end_date, limit, offset, current_user, db)
-    return {"items": db_movements}
+    columns = list_columns(MovementsResponse, Movements, fast)
+    db_movements = await repository_movements.get_movements_by_period(start_date, end_date, limit, offset, current_user, db, cursor, columns)
+    return list_response(db_movements, limit, cursor, fast)
 
 
 @router.get("/by_currency/{currency}", response_model=MovementsListResponse, status_code=status.HTTP_200_OK,
@@ -128,11 +148,14 @@ async def read_movements_by_currency(
         currency: str,
         offset: int = 0,
         limit: int = 2000,
+        cursor: Optional[str] = None,
+        fast: bool = Query(False, description="Skip validation and encode rows with orjson"),
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_movements = await repository_movements.get_movements_by_currency(currency, limit, offset, current_user, db)
-    return {"items": db_movements}
+    columns = list_columns(MovementsResponse, Movements, fast)
+    db_movements = await repository_movements.get_movements_by_currency(currency, limit, offset, current_user, db, cursor, columns)
+    return list_response(db_movements, limit, cursor, fast)
 
 
 @router.get("/milti_filter/{filter_params}", response_model=MovementsListResponse, status_code=status.HTTP_200_OK,
@@ -141,14 +164,62 @@ async def read_movements_by_milti_filter(
         filter_params: MovementsFilter = Depends(),
         offset: int = 0,
         limit: int = 2000,
+        cursor: Optional[str] = None,
+        fast: bool = Query(False, description="Skip validation and encode rows with orjson"),
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     # Створіть словник параметрів для передачі в функцію repository_movements.get_filtered_movements
     query_params = {k: v for k, v in filter_params.dict().items() if v is not None}
-    print("WTFFF", query_params)
 
     # Отримайте вибірку з бази даних за заданими параметрами
-    db_movements = await repository_movements.get_filtered_movements(query_params, limit, offset, current_user, db)
+    columns = list_columns(MovementsResponse, Movements, fast)
+    db_movements, total = await repository_movements.get_filtered_movements(query_params, limit, offset,
+                                                                            current_user, db, cursor, columns)
 
-    return {"items": db_movements}
+    return list_response(db_movements, limit, cursor, fast, total=total)
+
+
+@router.get("/export/by_period", response_class=StreamingResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_get_movements), Depends(RateLimiter(times=10, seconds=60))])
+async def export_movements_by_period(
+        start_date: date,
+        end_date: date,
+        export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    # Рядки стрімляться з серверного курсора, пам'ять не залежить від довжини періоду
+    columns = list(MovementsResponse.__fields__)
+    partitions = await repository_movements.stream_movements_by_period(start_date, end_date, columns, current_user, db)
+    filename = f"movements_{start_date}_{end_date}.{export_format.value}"
+    return StreamingResponse(export_rows(columns, partitions, export_format),
+                             media_type=EXPORT_MEDIA_TYPES[export_format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.get("/aggregate/", response_model=MovementsAggregateResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_get_movements), Depends(RateLimiter(times=10, seconds=60))])
+async def aggregate_movements(
+        filter_params: MovementsFilter = Depends(),
+        group_by: List[AggregateDimension] = Query([], description="Dimensions to group by"),
+        bucket: Optional[TimeBucket] = Query(None, description="Time bucket; omit to aggregate the whole period"),
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    # Суми рахуються з денного куба movements_daily, а не з сирих рядків
+    query_params = {k: v for k, v in filter_params.dict().items() if v is not None}
+    dimensions = list(dict.fromkeys(dimension.value for dimension in group_by))
+    rows = await repository_cube.aggregate_movements(dimensions, bucket.value if bucket else None, query_params,
+                                                     current_user, db)
+    return {"items": rows}
+
+
+@router.post("/aggregate/rebuild", status_code=status.HTTP_200_OK,
+             dependencies=[Depends(allowed_rebuild_cube), Depends(RateLimiter(times=10, seconds=60))])
+async def rebuild_movements_cube(
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    rows = await repository_cube.rebuild_movements_cube(current_user, db)
+    return {"status": "success", "message": "Movements cube rebuilt successfully", "rows": rows}
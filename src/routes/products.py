@@ -1,20 +1,22 @@
 from datetime import date
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Depends, status, Query, Body
-from fastapi_limiter.depends import RateLimiter
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Body, Request, Response
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.conf import messages
 from src.database.db import get_db
-from src.database.models import User, UserRole, DailyStockReports
+from src.database.models import User, UserRole, DailyStockReports, Products
 from src.repository import products as repository_products
 from src.schemas import ProductModel
 from src.services.auth.auth import auth_service
 from src.services.auth.role import RoleAccess
+from src.services.etag import conditional_get
+from src.services.rate_limit import RateLimiter
+from src.services.timing import TimedRoute
 
-router = APIRouter(prefix='/products', tags=["products"])
+router = APIRouter(prefix='/products', tags=["products"], route_class=TimedRoute)
 
 allowed_get_products = RoleAccess([UserRole.admin, UserRole.user])  # noqa
 
@@ -23,13 +25,18 @@ allowed_get_products = RoleAccess([UserRole.admin, UserRole.user])  # noqa
             status_code=status.HTTP_200_OK,
             dependencies=[Depends(allowed_get_products), Depends(RateLimiter(times=10, seconds=60))])
 async def get_products(
+        request: Request,
+        response: Response,
         language: str = Query("english_name", description="Language for product names"),
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
 ):
+    not_modified = await conditional_get(request, response, Products, db, language)
+    if not_modified:
+        return not_modified
 
     # Передайте фільтри у функцію get_stocks_in_period
-    products = await repository_products.get_products(current_user, db, language)
+    products = await repository_products.get_products(current_user, db, language, request.state.table_version)
 
     if products is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
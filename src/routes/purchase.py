@@ -1,26 +1,32 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
+from decimal import Decimal
+from typing import Optional
 
 from src.conf import messages
 from src.database.db import get_db
 from src.database.models import User, UserRole
 from src.repository import purchase as repository_purchase
-from src.schemas import PurchaseCreate, PurchaseUpdate, PurchaseResponse, PurchaseListResponse
+from src.repository import costing as repository_costing
+from src.schemas import PurchaseCreate, PurchaseUpdate, PurchaseResponse, PurchaseListResponse, ValuationResponse
 from src.services.auth.auth import auth_service
+from src.services.pagination import next_cursor
 from src.services.auth.role import RoleAccess
+from src.services.rate_limit import RateLimiter
+from src.services.timing import TimedRoute
 
-router = APIRouter(prefix='/purchase', tags=["purchase"])
+router = APIRouter(prefix='/purchase', tags=["purchase"], route_class=TimedRoute)
 
 allowed_get_purchase = RoleAccess([UserRole.admin, UserRole.user])  # noqa
+allowed_rebuild_costing = RoleAccess([UserRole.admin])  # noqa
 
 
 @router.post("/", response_model=PurchaseResponse, status_code=status.HTTP_201_CREATED,
              dependencies=[Depends(allowed_get_purchase), Depends(RateLimiter(times=10, seconds=60))])
 async def create_purchase_endpoint(purchase_data: PurchaseCreate,
                                    current_user: User = Depends(auth_service.get_current_user),
-                                   db: Session = Depends(get_db)
+                                   db: AsyncSession = Depends(get_db)
                                    ):
     return await repository_purchase.create_purchase(purchase_data, current_user, db)
 
@@ -28,7 +34,7 @@ async def create_purchase_endpoint(purchase_data: PurchaseCreate,
 @router.get("/{purchase_id}", response_model=PurchaseResponse, status_code=status.HTTP_200_OK,
             dependencies=[Depends(allowed_get_purchase), Depends(RateLimiter(times=10, seconds=60))])
 async def read_purchase(purchase_id: int, current_user: User = Depends(auth_service.get_current_user),
-                        db: Session = Depends(get_db)):
+                        db: AsyncSession = Depends(get_db)):
     db_purchase = await repository_purchase.get_purchase(purchase_id, current_user, db)
 
     if db_purchase is None:
@@ -40,7 +46,7 @@ async def read_purchase(purchase_id: int, current_user: User = Depends(auth_serv
             dependencies=[Depends(allowed_get_purchase), Depends(RateLimiter(times=10, seconds=60))])
 async def update_purchase_endpoint(purchase_id: int, purchase_data: PurchaseUpdate,
                                    current_user: User = Depends(auth_service.get_current_user),
-                                   db: Session = Depends(get_db)
+                                   db: AsyncSession = Depends(get_db)
                                    ):
     db_purchase = await repository_purchase.update_purchase(purchase_id, purchase_data, current_user, db)
     if db_purchase is None:
@@ -53,7 +59,7 @@ async def update_purchase_endpoint(purchase_id: int, purchase_data: PurchaseUpda
                dependencies=[Depends(allowed_get_purchase), Depends(RateLimiter(times=10, seconds=60))])
 async def delete_purchase_endpoint(purchase_id: int,
                                    current_user: User = Depends(auth_service.get_current_user),
-                                   db: Session = Depends(get_db)
+                                   db: AsyncSession = Depends(get_db)
                                    ):
     db_purchase = await repository_purchase.delete_purchase(purchase_id, current_user, db)
     if db_purchase is None:
@@ -71,11 +77,12 @@ async def delete_purchase_endpoint(purchase_id: int,
 async def read_purchases(
         offset: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_purchases = await repository_purchase.get_purchases(limit, offset, current_user, db)
-    return {"items": db_purchases}
+    db_purchases = await repository_purchase.get_purchases(limit, offset, current_user, db, cursor)
+    return {"items": db_purchases, "next_cursor": next_cursor(db_purchases, limit, cursor)}
 
 
 @router.get("/by_company/{company_id}", response_model=PurchaseListResponse, status_code=status.HTTP_200_OK,
@@ -84,11 +91,12 @@ async def read_purchases_by_company(
         company_id: int,
         offset: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_purchases = await repository_purchase.get_purchases_by_company(company_id, limit, offset, current_user, db)
-    return {"items": db_purchases}
+    db_purchases = await repository_purchase.get_purchases_by_company(company_id, limit, offset, current_user, db, cursor)
+    return {"items": db_purchases, "next_cursor": next_cursor(db_purchases, limit, cursor)}
 
 
 # @router.get("/by_product/{product_id}", response_model=PurchaseListResponse, status_code=status.HTTP_200_OK,
@@ -98,7 +106,7 @@ async def read_purchases_by_company(
 #         offset: int = 0,
 #         limit: int = 100,
 #         current_user: User = Depends(auth_service.get_current_user),
-#         db: Session = Depends(get_db)
+#         db: AsyncSession = Depends(get_db)
 # ):
 #     db_purchases = await repository_purchase.get_purchases_by_product(product_id, limit, offset, current_user, db)
 #     return {"items": db_purchases}
@@ -108,11 +116,12 @@ async def read_purchases_by_product(
         product_id: int,
         offset: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_purchases = await repository_purchase.get_purchases_by_product(product_id, limit, offset, current_user, db)
-    return {"items": db_purchases}
+    db_purchases = await repository_purchase.get_purchases_by_product(product_id, limit, offset, current_user, db, cursor)
+    return {"items": db_purchases, "next_cursor": next_cursor(db_purchases, limit, cursor)}
 
 
 # @router.get("/by_period/{start_date}/{end_date}/{offset}/{limit}", response_model=PurchaseListResponse, status_code=status.HTTP_200_OK,
@@ -123,7 +132,7 @@ async def read_purchases_by_product(
 #         offset: int = 0,
 #         limit: int = 100,
 #         current_user: User = Depends(auth_service.get_current_user),
-#         db: Session = Depends(get_db)
+#         db: AsyncSession = Depends(get_db)
 # ):
 #     db_purchases = await repository_purchase.get_purchases_by_period(start_date, end_date, limit, offset, current_user, db)
 #     return {"items": db_purchases}
@@ -136,8 +145,35 @@ async def read_purchases_by_period(
         end_date: date,
         offset: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_purchases = await repository_purchase.get_purchases_by_period(start_date, end_date, limit, offset, current_user, db)
-    return {"items": db_purchases}
\ No newline at end of file
+    db_purchases = await repository_purchase.get_purchases_by_period(start_date, end_date, limit, offset, current_user, db, cursor)
+    return {"items": db_purchases, "next_cursor": next_cursor(db_purchases, limit, cursor)}
+
+
+@router.get("/valuation/", response_model=ValuationResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_get_purchase), Depends(RateLimiter(times=10, seconds=60))])
+async def read_valuation(
+        as_of: Optional[date] = None,
+        product_id: Optional[int] = None,
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    # Оцінка складу за ковзною середньозваженою собівартістю: поточна або на кінець дня as_of
+    items = await repository_costing.get_valuation(as_of, product_id, current_user, db)
+    return {"as_of": as_of,
+            "total_value_tl": sum((item.value_tl for item in items), Decimal(0)),
+            "total_value_usd": sum((item.value_usd for item in items), Decimal(0)),
+            "items": items}
+
+
+@router.post("/valuation/rebuild", status_code=status.HTTP_200_OK,
+             dependencies=[Depends(allowed_rebuild_costing), Depends(RateLimiter(times=10, seconds=60))])
+async def rebuild_costing(
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    rows = await repository_costing.rebuild_costing(current_user, db)
+    return {"status": "success", "message": "Purchase costing rebuilt successfully", "rows": rows}
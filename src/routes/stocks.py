@@ -2,9 +2,8 @@ from datetime import date
 from typing import List
 
 from fastapi import APIRouter, HTTPException, Depends, status, Query, Body
-from fastapi_limiter.depends import RateLimiter
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.conf import messages
 from src.database.db import get_db
@@ -13,8 +12,10 @@ from src.repository import stocks as repository_stocks
 from src.schemas import DailyStockReportModel
 from src.services.auth.auth import auth_service
 from src.services.auth.role import RoleAccess
+from src.services.rate_limit import RateLimiter
+from src.services.timing import TimedRoute
 
-router = APIRouter(prefix='/stocks', tags=["stocks"])
+router = APIRouter(prefix='/stocks', tags=["stocks"], route_class=TimedRoute)
 
 allowed_get_stocks = RoleAccess([UserRole.admin, UserRole.user])  # noqa
 
@@ -30,7 +31,7 @@ async def get_stocks(
         limit: int = Query(10, le=250),
         current_user: User = Depends(auth_service.get_current_user),
         offset: int = 0,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
 ):
     # Перевірте, чи обрані дати в правильному порядку
     if start_date > end_date:
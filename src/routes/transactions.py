@@ -1,34 +1,107 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.orm import Session
+import csv
+import io
+
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Body, UploadFile, File, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, JSONResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
+from typing import List, Optional
 
 from src.conf import messages
 from src.database.db import get_db
 from src.database.models import User, UserRole, Transaction
 from src.repository import transactions as repository_transaction
-from src.schemas import TransactionCreateUpdate, TransactionResponse, TransactionListResponse, TurnoverListResponse
+from src.repository import turnover as repository_turnover
+from src.schemas import TransactionCreateUpdate, TransactionResponse, TransactionListResponse, TurnoverListResponse, \
+    TurnoverCheckResponse, ExportFormat, BulkInsertResponse
 from src.services.auth.auth import auth_service
+from src.services.fast_json import list_columns, list_response
+from src.services.export import export_rows, EXPORT_MEDIA_TYPES
 from src.services.auth.role import RoleAccess
+from src.services.rate_limit import RateLimiter
+from src.services.response_cache import cached_response, TURNOVER_NAMESPACE
+from src.services.timing import TimedRoute
 
-router = APIRouter(prefix='/transactions', tags=["transactions"])
+router = APIRouter(prefix='/transactions', tags=["transactions"], route_class=TimedRoute)
 
 allowed_get_transaction = RoleAccess([UserRole.admin, UserRole.user])  # noqa
+allowed_rebuild_turnover = RoleAccess([UserRole.admin])  # noqa
 
 
 @router.post("/", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED,
              dependencies=[Depends(allowed_get_transaction), Depends(RateLimiter(times=10, seconds=60))])
 async def create_transaction(transaction_data: TransactionCreateUpdate,
                                    current_user: User = Depends(auth_service.get_current_user),
-                                   db: Session = Depends(get_db)
+                                   db: AsyncSession = Depends(get_db)
                                    ):
     return await repository_transaction.create_transaction(transaction_data, current_user, db)
 
 
+def _validate_rows(rows: List[dict]):
+    # Валідація всієї пачки за один прохід, помилки збираються по номеру рядка
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            transaction = TransactionCreateUpdate.parse_obj(row)
+        except ValidationError as err:
+            errors.append({"row": index, "errors": err.errors()})
+            continue
+        if transaction.accounting_type not in repository_transaction.ACCOUNTING_TYPES:
+            errors.append({"row": index, "errors": [{
+                "loc": ("accounting_type",), "type": "type_error.enum",
+                "msg": f"value is not a valid enumeration member; permitted: "
+                       f"{', '.join(repr(value) for value in repository_transaction.ACCOUNTING_TYPES)}",
+            }]})
+            continue
+        valid.append(transaction)
+    return valid, errors
+
+
+async def _bulk_insert(rows: List[dict], current_user: User, db: AsyncSession):
+    transactions, errors = _validate_rows(rows)
+    if not errors:
+        errors = await repository_transaction.find_missing_references(transactions, db)
+    if errors:
+        # Пачка вставляється атомарно: при будь-якій помилці не записується жоден рядок
+        return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            content=jsonable_encoder({"inserted": 0, "errors": errors}))
+    inserted = await repository_transaction.bulk_create_transactions(transactions, current_user, db)
+    return {"inserted": inserted, "errors": []}
+
+
+@router.post("/bulk", response_model=BulkInsertResponse, status_code=status.HTTP_201_CREATED,
+             description="JSON array of transactions, inserted with one COPY or not at all",
+             dependencies=[Depends(allowed_get_transaction), Depends(RateLimiter(times=10, seconds=60))])
+async def bulk_create_transactions(rows: List[dict] = Body(...),
+                                   current_user: User = Depends(auth_service.get_current_user),
+                                   db: AsyncSession = Depends(get_db)
+                                   ):
+    return await _bulk_insert(rows, current_user, db)
+
+
+@router.post("/bulk/csv", response_model=BulkInsertResponse, status_code=status.HTTP_201_CREATED,
+             description="CSV file with a header row of TransactionCreateUpdate fields",
+             dependencies=[Depends(allowed_get_transaction), Depends(RateLimiter(times=10, seconds=60))])
+async def bulk_create_transactions_csv(file: UploadFile = File(),
+                                       current_user: User = Depends(auth_service.get_current_user),
+                                       db: AsyncSession = Depends(get_db)
+                                       ):
+    try:
+        content = (await file.read()).decode("utf-8-sig")
+        # Порожні клітинки CSV означають відсутнє значення
+        rows = [{key: value if value != "" else None for key, value in row.items()}
+                for row in csv.DictReader(io.StringIO(content))]
+    except (UnicodeDecodeError, csv.Error):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=messages.INVALID_CSV)
+    return await _bulk_insert(rows, current_user, db)
+
+
 @router.get("/{transaction_id}", response_model=TransactionResponse, status_code=status.HTTP_200_OK,
             dependencies=[Depends(allowed_get_transaction), Depends(RateLimiter(times=10, seconds=60))])
 async def read_transaction(transaction_id: int, current_user: User = Depends(auth_service.get_current_user),
-                        db: Session = Depends(get_db)):
+                        db: AsyncSession = Depends(get_db)):
     db_transaction = await repository_transaction.get_transaction(transaction_id, current_user, db)
 
     if db_transaction is None:
@@ -42,17 +115,12 @@ async def update_transaction(
     transaction_id: int,
     transaction_data: TransactionCreateUpdate,
     current_user: User = Depends(auth_service.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> TransactionResponse:
-    # Реалізація логіки для оновлення запису в базі даних
-    db_transaction = await repository_transaction.get_transaction(transaction_id, current_user, db)
+    # Оновлення йде через репозиторій, щоб разом з записом оновився rollup оборотів
+    db_transaction = await repository_transaction.update_transaction(transaction_id, current_user, transaction_data, db)
     if db_transaction is None:
-        return None
-    for key, value in transaction_data.dict().items():
-        if hasattr(db_transaction, key):
-            setattr(db_transaction, key, value)
-    db.commit()
-    db.refresh(db_transaction)
+        raise HTTPException(status_code=404, detail=messages.NOT_FOUND)
     return db_transaction
 
 
@@ -61,7 +129,7 @@ async def update_transaction(
                dependencies=[Depends(allowed_get_transaction), Depends(RateLimiter(times=10, seconds=60))])
 async def delete_transaction(transaction_id: int,
                                    current_user: User = Depends(auth_service.get_current_user),
-                                   db: Session = Depends(get_db)
+                                   db: AsyncSession = Depends(get_db)
                                    ):
     db_transaction = await repository_transaction.delete_transaction(transaction_id, current_user, db)
     if db_transaction is None:
@@ -79,11 +147,14 @@ async def delete_transaction(transaction_id: int,
 async def read_transactions(
         offset: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
+        fast: bool = Query(False, description="Skip validation and encode rows with orjson"),
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_transaction = await repository_transaction.get_transactions(limit, offset, current_user, db)
-    return {"items": db_transaction}
+    columns = list_columns(TransactionResponse, Transaction, fast)
+    db_transaction = await repository_transaction.get_transactions(limit, offset, current_user, db, cursor, columns)
+    return list_response(db_transaction, limit, cursor, fast)
 
 
 @router.get("/by_company/{company_id}", response_model=TransactionListResponse, status_code=status.HTTP_200_OK,
@@ -92,11 +163,14 @@ async def read_transactions_by_company(
         company_id: int,
         offset: int = 0,
         limit: int = 2000,
+        cursor: Optional[str] = None,
+        fast: bool = Query(False, description="Skip validation and encode rows with orjson"),
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_transaction = await repository_transaction.get_transaction_by_company(company_id, limit, offset, current_user, db)
-    return {"items": db_transaction}
+    columns = list_columns(TransactionResponse, Transaction, fast)
+    db_transaction = await repository_transaction.get_transaction_by_company(company_id, limit, offset, current_user, db, cursor, columns)
+    return list_response(db_transaction, limit, cursor, fast)
 
 
 @router.post("/by_period", response_model=TransactionListResponse, status_code=status.HTTP_200_OK,
@@ -106,33 +180,85 @@ async def read_purchases_by_period(
         end_date: date,
         offset: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
+        fast: bool = Query(False, description="Skip validation and encode rows with orjson"),
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_transaction = await repository_transaction.get_transaction_by_period(start_date, end_date, limit, offset, current_user, db)
-    return {"items": db_transaction}
+    columns = list_columns(TransactionResponse, Transaction, fast)
+    db_transaction = await repository_transaction.get_transaction_by_period(start_date, end_date, limit, offset, current_user, db, cursor, columns)
+    return list_response(db_transaction, limit, cursor, fast)
 
 
 @router.get("/turnover/", response_model=TurnoverListResponse, status_code=status.HTTP_200_OK,
             dependencies=[Depends(auth_service.get_current_user), Depends(RateLimiter(times=10, seconds=60))])
 async def read_turnover_by_company(
+        request: Request,
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_turnover = await repository_transaction.get_turnover_by_company(current_user, db)
+    async def compute() -> bytes:
+        db_turnover = await repository_transaction.get_turnover_by_company(current_user, db)
+        return TurnoverListResponse(items=db_turnover).json().encode()
 
-    return {"items": db_turnover}
+    return await cached_response(TURNOVER_NAMESPACE, "turnover", {}, compute,
+                                 request.headers.get("accept-encoding"))
 
 
 @router.get("/turnover/by_period", response_model=TurnoverListResponse, status_code=status.HTTP_200_OK,
             dependencies=[Depends(auth_service.get_current_user), Depends(RateLimiter(times=10, seconds=60))])
 async def get_turnover_by_company_in_period(
+        request: Request,
         start_date: date,
         end_date: date,
         current_user: User = Depends(auth_service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    db_turnover = await repository_transaction.get_turnover_by_company_in_period(start_date, end_date, current_user, db)
+    async def compute() -> bytes:
+        db_turnover = await repository_transaction.get_turnover_by_company_in_period(start_date, end_date,
+                                                                                     current_user, db)
+        return TurnoverListResponse(items=db_turnover).json().encode()
+
+    return await cached_response(TURNOVER_NAMESPACE, "turnover/by_period",
+                                 {"start_date": start_date, "end_date": end_date}, compute,
+                                 request.headers.get("accept-encoding"))
 
-    return {"items": db_turnover}
 
+
+
+@router.post("/turnover/rebuild", status_code=status.HTTP_200_OK,
+             dependencies=[Depends(allowed_rebuild_turnover), Depends(RateLimiter(times=10, seconds=60))])
+async def rebuild_turnover(
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    rows = await repository_turnover.rebuild_turnover(current_user, db)
+    return {"status": "success", "message": "Turnover rollup rebuilt successfully", "rows": rows}
+
+
+@router.get("/turnover/check", response_model=TurnoverCheckResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_rebuild_turnover), Depends(RateLimiter(times=10, seconds=60))])
+async def check_turnover(
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    mismatches = await repository_turnover.check_turnover(current_user, db)
+    return {"consistent": not mismatches, "mismatches": mismatches}
+
+
+@router.get("/export/by_period", response_class=StreamingResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(allowed_get_transaction), Depends(RateLimiter(times=10, seconds=60))])
+async def export_transactions_by_period(
+        start_date: date,
+        end_date: date,
+        export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    # Рядки стрімляться з серверного курсора, пам'ять не залежить від довжини періоду
+    columns = list(TransactionResponse.__fields__)
+    partitions = await repository_transaction.stream_transactions_by_period(start_date, end_date, columns, current_user, db)
+    filename = f"transactions_{start_date}_{end_date}.{export_format.value}"
+    return StreamingResponse(export_rows(columns, partitions, export_format),
+                             media_type=EXPORT_MEDIA_TYPES[export_format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -150,11 +150,32 @@ class PurchaseResponse(PurchaseCreateUpdate):
 
 class PurchaseListResponse(BaseModel):
     items: List[PurchaseResponse]
+    next_cursor: Optional[str] = None
 
     class Config:
         orm_mode = True
 
 
+class ProductValuationResponse(BaseModel):
+    product_id: int
+    quantity: float
+    avg_cost_tl: Decimal
+    avg_cost_usd: Decimal
+    value_tl: Decimal
+    value_usd: Decimal
+    last_date: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class ValuationResponse(BaseModel):
+    as_of: Optional[date] = None
+    total_value_tl: Decimal
+    total_value_usd: Decimal
+    items: List[ProductValuationResponse]
+
+
 class PurchaseBase(BaseModel):
     date: datetime
     operation_type: str
@@ -207,6 +228,11 @@ class OperationRegion(str, Enum):
     import_: str = "import"  # "import" є зарезервованим словом, тому використовуємо "import_"
 
 
+class ExportFormat(str, Enum):
+    ndjson: str = "ndjson"
+    csv: str = "csv"
+
+
 class CurrencyType(str, Enum):
     tl: str = "tl"
     eur: str = "eur"
@@ -256,6 +282,16 @@ class TransactionCreateUpdate(BaseModel):
         orm_mode = True
 
 
+class BulkRowError(BaseModel):
+    row: int
+    errors: List[dict]
+
+
+class BulkInsertResponse(BaseModel):
+    inserted: int
+    errors: List[BulkRowError] = []
+
+
 class TransactionResponse(BaseModel):
     id: int
     date: date
@@ -282,6 +318,7 @@ class TransactionResponse(BaseModel):
 
 class TransactionListResponse(BaseModel):
     items: List[TransactionResponse]
+    next_cursor: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -308,6 +345,22 @@ class TurnoverListResponse(BaseModel):
         orm_mode = True
 
 
+class TurnoverMismatch(BaseModel):
+    month: Optional[date] = None
+    company_id: int
+    currency: CurrencyType
+    accounting_type: str
+    expenses_category: ExpensesType
+    field: str
+    expected: float
+    actual: float
+
+
+class TurnoverCheckResponse(BaseModel):
+    consistent: bool
+    mismatches: List[TurnoverMismatch]
+
+
 class ExchRateCreate(BaseModel):
     date: date
     usd_tl_rate: Decimal
@@ -390,11 +443,80 @@ class MovementsResponse(BaseModel):
 
 class MovementsListResponse(BaseModel):
     items: List[MovementsResponse]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+
+class AccountBalanceResponse(BaseModel):
+    currency: CurrencyType
+    balance: float
 
     class Config:
         orm_mode = True
 
 
+class AccountBalanceListResponse(BaseModel):
+    account_id: int
+    as_of: date
+    items: List[AccountBalanceResponse]
+
+
+class AggregateDimension(str, Enum):
+    company_id: str = "company_id"
+    payment_way: str = "payment_way"
+    currency: str = "currency"
+    account_type: str = "account_type"
+    operation_type: str = "operation_type"
+
+
+class TimeBucket(str, Enum):
+    day: str = "day"
+    week: str = "week"
+    month: str = "month"
+    year: str = "year"
+
+
+class MovementsAggregateRow(BaseModel):
+    bucket: Optional[date] = None
+    company_id: Optional[int] = None
+    payment_way: Optional[int] = None
+    currency: Optional[str] = None
+    account_type: Optional[str] = None
+    operation_type: Optional[str] = None
+    debit: float
+    credit: float
+    movements_count: int
+
+
+class MovementsAggregateResponse(BaseModel):
+    items: List[MovementsAggregateRow]
+
+
+class LedgerSource(str, Enum):
+    movement: str = "movement"
+    transaction: str = "transaction"
+
+
+class LedgerEntryResponse(BaseModel):
+    source: LedgerSource
+    id: int
+    date: date
+    description: Optional[str] = None
+    operation_type: OperationType
+    currency: CurrencyType
+    sum: float
+    balance: float
+
+
+class LedgerResponse(BaseModel):
+    company_id: int
+    items: List[LedgerEntryResponse]
+    next_cursor: Optional[str] = None
+
+
 class MovementsFilter(BaseModel):
     start_date: Optional[date] = None
     end_date: Optional[date] = None
@@ -408,3 +530,54 @@ class MovementsFilter(BaseModel):
         orm_mode = True
 
 
+class PoolMetricsResponse(BaseModel):
+    size: int
+    max_overflow: int
+    in_use: int
+    idle: int
+    overflow: int
+    checkouts: int
+    checkout_timeouts: int
+    checkout_errors: int
+    checkout_wait_avg_ms: float
+    checkout_wait_max_ms: float
+
+
+class RouteLatencyResponse(BaseModel):
+    route: str
+    count: int
+    avg_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class PasswordHashingMetricsResponse(BaseModel):
+    workers: int
+    rounds: int
+    queue_depth: int
+    running: int
+    completed: int
+    avg_ms: float
+
+
+class RedisPoolMetrics(BaseModel):
+    max_connections: int
+    created: int
+    in_use: int
+    idle: int
+    saturation: float
+    checkout_timeouts: int
+    checkout_errors: int
+    checkout_wait_avg_ms: float
+    checkout_wait_max_ms: float
+
+
+class RedisMetricsResponse(BaseModel):
+    commands: int
+    errors: int
+    commands_per_sec: float
+    latency_avg_ms: float
+    latency_max_ms: float
+    pool: Optional[RedisPoolMetrics] = None
@@ -1,44 +1,53 @@
-import pickle
+import json
+import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
-import redis as redis
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.conf import messages
 from src.conf.config import settings
 from src.database.db import get_db
 from src.repository import users as repository_users
+from src.services.auth.password import password_hasher
+from src.services.auth.user_cache import TTLCache, user_cache
+from src.services.timing import timed
+
+logger = logging.getLogger(__name__)
+
+
+def log_debug(event: str, **fields) -> None:
+    # json.dumps лише коли debug справді увімкнено - на гарячому шляху це зайва робота
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps({'event': event, **fields}, default=str))
 
 
 class Auth:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = password_hasher.pwd_context
     SECRET_KEY = settings.secret_key
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    r = redis.Redis(host=settings.redis_host,
-                    port=settings.redis_port,
-                    password=settings.redis_password,
-                    db=0)
+    # Перевірений токен -> (email, scope, exp); запис живе не довше за сам токен
+    token_cache = TTLCache(settings.token_cache_size, settings.token_cache_ttl)
 
-    def verify_password(self, plain_password, hashed_password):
+    async def verify_password(self, plain_password, hashed_password):
         """
         The verify_password function takes a plain-text password and hashed
         password as arguments. It then uses the pwd_context object to verify that the
-        plain-text password matches the hashed one.
+        plain-text password matches the hashed one. bcrypt runs in the password_hasher thread pool.
 
         :param self: Make the function a method of the user class
         :param plain_password: Take in the password that is entered by the user
         :param hashed_password: Check if the password is correct
         :return: A boolean value
         """
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return await password_hasher.verify(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
+    async def get_password_hash(self, password: str):
         """
         The get_password_hash function takes a password as input and returns the hash of that password.
         The hash is generated using the pwd_context object, which is an instance of Flask-Bcrypt's Bcrypt class.
@@ -47,7 +56,7 @@ class Auth:
         :param password: str: Pass in the password that we want to hash
         :return: A hash of the password
         """
-        return self.pwd_context.hash(password)
+        return await password_hasher.hash(password)
 
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
         """
@@ -91,7 +100,29 @@ class Auth:
         encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         return encoded_refresh_token
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    def decode_access_token(self, token: str) -> Tuple[str, str, int]:
+        """
+        The decode_access_token function verifies an access token and returns its claims.
+        A token that was already verified is answered from token_cache until it expires,
+        so repeated requests with the same token skip the signature check.
+
+        :param self: Represent the instance of the class
+        :param token: str: The bearer token
+        :return: An (email, scope, exp) tuple
+        """
+        claims = self.token_cache.get(token)
+        if claims is not None and claims[2] > time.time():
+            log_debug('access_token', cached=True, sub=claims[0])
+            return claims
+
+        payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        claims = (payload.get("sub"), payload.get("scope"), payload.get("exp"))
+        log_debug('access_token', cached=False, sub=claims[0], scope=claims[1], exp=claims[2])
+        if claims[0] is not None and claims[1] == "access_token" and claims[2] is not None:
+            self.token_cache.set(token, claims, ttl=claims[2] - time.time())
+        return claims
+
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
         """
         The get_current_user function is a dependency that will be used in the
             protected endpoints. It takes a token as an argument and returns the user
@@ -99,7 +130,7 @@ class Auth:
 
         :param self: Refer to the class itself
         :param token: str: Pass the token to the function
-        :param db: Session: Get the database session
+        :param db: AsyncSession: Get the database session
         :return: A user object
         """
         credentials_exception = HTTPException(
@@ -108,31 +139,22 @@ class Auth:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-        try:
-            # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            print(token)
-            print(payload)
-            if payload.get("scope") == "access_token":
-                email = payload.get("sub")
-                print(email)
-                if email is None:
-                    raise credentials_exception
-            else:
+        # Час декодування JWT і пошуку користувача (Redis/БД) йде в Server-Timing як auth
+        with timed('auth'):
+            try:
+                email, scope, _ = self.decode_access_token(token)
+            except JWTError as e:
+                log_debug('access_token_rejected', reason=str(e))
+                raise credentials_exception
+            if scope != "access_token" or email is None:
                 raise credentials_exception
-        except JWTError as e:
-            print(e)
-            raise credentials_exception
 
-        user = self.r.get(f"user:{email}")
-        if user is None:
-            user = await repository_users.get_user_by_email(email, db)
+            user = await user_cache.get(email)
             if user is None:
-                raise credentials_exception
-            self.r.set(f"user:{email}", pickle.dumps(user)) # noqa
-            self.r.expire(f"user:{email}", 900) # noqa
-        else:
-            user = pickle.loads(user) # noqa
+                user = await repository_users.get_user_by_email(email, db)
+                if user is None:
+                    raise credentials_exception
+                await user_cache.set(user)
 
         return user
 
@@ -197,9 +219,9 @@ class Auth:
 
 
 class AuthPassword:
-    pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+    pwd_context = password_hasher.pwd_context
 
-    def get_hash_password(self, password: str):
+    async def get_hash_password(self, password: str):
         """
         The get_hash_password function takes a password as an argument and returns the hashed version of that password.
         The hash is generated using the pwd_context object's hash method, which uses bcrypt to generate a secure hash.
@@ -208,9 +230,9 @@ class AuthPassword:
         :param password: str: Pass the password entered by the user to be hashed
         :return: A hash of the password
         """
-        return self.pwd_context.hash(password)
+        return await password_hasher.hash(password)
 
-    def verify_password(self, password: str, hashed_password: str):
+    async def verify_password(self, password: str, hashed_password: str):
         """
         The verify_password function takes a plain-text password and hashed password as arguments.
         It then uses the verify method of the pwd_context object to check if they match.
@@ -220,7 +242,7 @@ class AuthPassword:
         :param hashed_password: str: Compare the password that is being passed in with the hashed_password
         :return: True if the password is correct, and false otherwise
         """
-        return self.pwd_context.verify(password, hashed_password)
+        return await password_hasher.verify(password, hashed_password)
 
 
 auth_service = Auth()
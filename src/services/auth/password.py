@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from src.conf.config import settings
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a dedicated, size-limited thread pool,
+    so a burst of logins queues up there instead of freezing the event loop.
+    bcrypt releases the GIL while it works, so the loop keeps serving other requests.
+    """
+
+    def __init__(self, rounds: int, workers: int):
+        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self.rounds = rounds
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.busy_total = 0.0
+
+    def _timed(self, func, *args):
+        with self._lock:
+            self.running += 1
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.busy_total += elapsed
+
+    async def _run(self, func, *args):
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self._timed, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self.pwd_context.verify, plain_password, hashed_password)
+
+    def metrics(self) -> dict:
+        """
+        The metrics function reports the state of the bcrypt pool.
+
+        :return: A dict with PasswordHashingMetricsResponse fields
+        """
+        with self._lock:
+            running, completed, busy_total = self.running, self.completed, self.busy_total
+        return {
+            'workers': self.workers,
+            'rounds': self.rounds,
+            'queue_depth': max(self.pending - running, 0),
+            'running': running,
+            'completed': completed,
+            'avg_ms': busy_total / completed * 1000 if completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(rounds=settings.bcrypt_rounds, workers=settings.bcrypt_workers)
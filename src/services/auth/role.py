@@ -4,7 +4,7 @@ from fastapi import Depends, HTTPException, status, Request
 
 from src.conf import messages
 from src.database.models import User, UserRole
-from src.services.auth.auth import auth_service
+from src.services.auth.auth import auth_service, log_debug
 
 
 class RoleAccess:
@@ -31,8 +31,8 @@ class RoleAccess:
         :param current_user: User: Get the current user from the database
         :return: A function, which is the decorated view
         """
-        print(request.method, request.url)
-        print(f'User role {current_user.roles}')
-        print(f'Allowed roles: {self.allowed_roles}')
+        log_debug('role_check', method=request.method, path=request.url.path,
+                  role=getattr(current_user.roles, 'value', current_user.roles),
+                  allowed=[role.value for role in self.allowed_roles])
         if current_user.roles not in self.allowed_roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=messages.FORBIDDEN)
\ No newline at end of file
@@ -0,0 +1,137 @@
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Hashable, Optional
+
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.models import User, UserRole
+from src.services.redis_pool import redis_manager
+
+# Поля, яких досить для авторизації і /me; паролі й токени в кеш не потрапляють
+USER_CACHE_FIELDS = ('id', 'username', 'email', 'avatar', 'roles', 'confirmed', 'created_at', 'updated_at')
+_DATETIME_FIELDS = ('created_at', 'updated_at')
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries also expire after ttl seconds
+    (or after the shorter ttl given to set for a single entry).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+def user_to_record(user: User) -> dict:
+    record = {field: getattr(user, field) for field in USER_CACHE_FIELDS}
+    record['roles'] = getattr(record['roles'], 'value', record['roles'])
+    for field in _DATETIME_FIELDS:
+        if record[field] is not None:
+            record[field] = record[field].isoformat()
+    return record
+
+
+def user_from_record(record: dict) -> User:
+    values = dict(record)
+    values['roles'] = UserRole(values['roles']) if values['roles'] is not None else None
+    for field in _DATETIME_FIELDS:
+        if values[field] is not None:
+            values[field] = datetime.fromisoformat(values[field])
+    # Transient User: ті самі атрибути, що й у завантаженого, але без сесії
+    return User(**values)
+
+
+class UserCache:
+    """
+    Two-tier cache of authenticated users: a per-process TTL LRU in front of Redis.
+    Redis holds a compact JSON record written with a single SETEX.
+    """
+
+    def __init__(self, ttl: int, local_ttl: float, local_size: int):
+        self.ttl = ttl
+        self.local = TTLCache(local_size, local_ttl)
+
+    @property
+    def r(self):
+        return redis_manager.client
+
+    @staticmethod
+    def key(email: str) -> str:
+        return f"user:{email}"
+
+    async def get(self, email: str) -> Optional[User]:
+        """
+        The get function returns the cached user, looking in process memory first and in Redis second.
+
+        :param email: str: Email of the user
+        :return: A transient User, or None on a miss in both tiers
+        """
+        record = self.local.get(email)
+        if record is None:
+            try:
+                raw = await self.r.get(self.key(email))
+            except RedisError:
+                return None
+            if raw is None:
+                return None
+            record = json.loads(raw)
+            self.local.set(email, record)
+        return user_from_record(record)
+
+    async def set(self, user: User) -> None:
+        record = user_to_record(user)
+        self.local.set(user.email, record)
+        try:
+            await self.r.setex(self.key(user.email), self.ttl, json.dumps(record))
+        except RedisError:
+            pass
+
+    async def invalidate(self, email: str) -> None:
+        """
+        The invalidate function drops a user from both tiers after the user row was changed.
+        Other worker processes keep their local copy for at most user_local_cache_ttl seconds.
+
+        :param email: str: Email of the changed user
+        :return: None
+        """
+        self.local.pop(email)
+        try:
+            await self.r.delete(self.key(email))
+        except RedisError:
+            pass
+
+
+user_cache = UserCache(
+    ttl=settings.user_cache_ttl,
+    local_ttl=settings.user_local_cache_ttl,
+    local_size=settings.user_local_cache_size,
+)
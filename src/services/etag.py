@@ -0,0 +1,61 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+
+
+async def table_version(model, db: AsyncSession) -> str:
+    """
+    The table_version function returns a cheap fingerprint of a reference table:
+    row count, max(id) and max(updated_at). Any insert, delete or ORM update changes it.
+
+    :param model: Mapped class with id and updated_at columns
+    :param db: AsyncSession: The database session
+    :return: The version string
+    """
+    count, max_id, max_updated = (await db.execute(
+        select(func.count(model.id), func.max(model.id), func.max(model.updated_at))
+    )).one()
+    return f"{count}:{max_id}:{max_updated.isoformat() if max_updated else ''}"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == '*':
+        return True
+    # Порівняння слабке (RFC 9110): префікс W/ не враховується
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return etag.removeprefix('W/') in candidates
+
+
+async def conditional_get(request: Request, response: Response, model, db: AsyncSession,
+                          *variant) -> Optional[Response]:
+    """
+    The conditional_get function implements ETag revalidation for reference data endpoints.
+    The ETag is derived from the table version and the parameters that shape the response (variant).
+    If the client already holds the current representation, a 304 response is returned and the
+    endpoint must return it without loading rows; otherwise ETag and Cache-Control are set on response.
+    The computed version is left in request.state.table_version.
+
+    :param request: Request: The incoming request, read for If-None-Match
+    :param response: Response: The response FastAPI will send, receives the headers
+    :param model: Mapped class of the table the endpoint reads
+    :param db: AsyncSession: The database session
+    :param variant: Query parameters that change the response (limit, offset, language...)
+    :return: A 304 Response, or None if the endpoint has to build the body
+    """
+    version = await table_version(model, db)
+    # Версію можуть перевикористати кеші ендпоінта (див. src.services.product_names)
+    request.state.table_version = version
+    digest = hashlib.sha1(':'.join(map(str, (request.url.path, version) + variant)).encode()).hexdigest()
+    etag = f'W/"{digest}"'
+    headers = {'ETag': etag, 'Cache-Control': f'private, max-age={settings.reference_cache_max_age}, must-revalidate'}
+
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterable, AsyncIterator, Sequence
+
+from src.schemas import ExportFormat
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return getattr(value, 'value', str(value))
+
+
+async def _ndjson(columns: Sequence[str], partitions: AsyncIterable[Sequence]) -> AsyncIterator[str]:
+    async for rows in partitions:
+        yield ''.join(json.dumps(dict(zip(columns, row)), default=_default, ensure_ascii=False) + '\n' for row in rows)
+
+
+async def _csv(columns: Sequence[str], partitions: AsyncIterable[Sequence]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_default(value) if isinstance(value, (date, Decimal)) else value for value in row]
+                         for row in rows)
+        yield buffer.getvalue()
+
+
+def export_rows(columns: Sequence[str], partitions: AsyncIterable[Sequence],
+                export_format: ExportFormat) -> AsyncIterator[str]:
+    """
+    The export_rows function turns batches of database rows into text chunks of the requested format.
+    Each batch becomes one chunk, so memory use is bounded by the batch size and not by the export length.
+
+    :param columns: Sequence[str]: Column names, in the order of the values in each row
+    :param partitions: AsyncIterable[Sequence]: Batches of rows, e.g. AsyncResult.partitions() of a streamed query
+    :param export_format: ExportFormat: ndjson or csv
+    :return: An async iterator of text chunks for a StreamingResponse
+    """
+    if export_format == ExportFormat.csv:
+        return _csv(columns, partitions)
+    return _ndjson(columns, partitions)
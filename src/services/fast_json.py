@@ -0,0 +1,99 @@
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from itertools import takewhile
+from typing import List, Optional, Sequence
+
+import orjson
+from fastapi import Response
+from sqlalchemy import Date, DateTime, cast
+
+from src.services.pagination import TOTAL_COUNT, CURSOR_DATE, next_cursor
+
+# Службові стовпці в кінці рядка, які не входять у items
+SERVICE_COLUMNS = (CURSOR_DATE, TOTAL_COUNT)
+
+
+@lru_cache(maxsize=None)
+def response_columns(schema, model) -> tuple:
+    """
+    The response_columns function maps the fields of a response schema to explicit columns of a model,
+    so a page can be selected as plain tuples instead of ORM objects.
+    DateTime columns exposed as date in the schema are cast to DATE, matching what pydantic would output;
+    the raw date is then selected once more as CURSOR_DATE, so the page cursor keeps the full timestamp.
+
+    :param schema: Pydantic response model, e.g. TransactionResponse
+    :param model: Mapped class the rows come from
+    :return: A tuple of labeled column expressions in schema field order, optionally followed by CURSOR_DATE
+    """
+    columns = []
+    cursor_date = None
+    for name, field in schema.__fields__.items():
+        column = getattr(model, name)
+        if field.outer_type_ is date and isinstance(column.type, DateTime):
+            if name == 'date':
+                cursor_date = column.label(CURSOR_DATE)
+            column = cast(column, Date)
+        columns.append(column.label(name))
+    if cursor_date is not None:
+        columns.append(cursor_date)
+    return tuple(columns)
+
+
+def _default(value):
+    # Як jsonable_encoder: Decimal віддається числом
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+def fast_list_response(rows: Sequence, next_cursor: Optional[str] = None, total: Optional[int] = None) -> Response:
+    """
+    The fast_list_response function encodes a page of rows fetched with response_columns straight to JSON with orjson.
+    The rows come from our own database through the schema's columns, so pydantic validation is skipped.
+
+    :param rows: Sequence: Rows selected with response_columns, optionally followed by total_count_column
+    :param next_cursor: str: Cursor of the following page
+    :param total: int: Number of rows matching the filters, added to the body when given
+    :return: A JSON Response with the same shape as the *ListResponse schemas
+    """
+    items: List[dict] = []
+    if rows:
+        # Службові стовпці йдуть останніми: zip зупиняється на коротшому і їх у items не переносить
+        names = tuple(takewhile(lambda name: name not in SERVICE_COLUMNS, rows[0]._fields))
+        items = [dict(zip(names, row)) for row in rows]
+    content = {"items": items, "next_cursor": next_cursor}
+    if total is not None:
+        content["total"] = total
+    body = orjson.dumps(content, default=_default)
+    return Response(content=body, media_type='application/json')
+
+
+def list_columns(schema, model, fast: bool) -> Optional[tuple]:
+    """
+    The list_columns function returns the columns a list endpoint selects: response_columns on the fast path,
+    None (ORM objects) otherwise.
+
+    :param schema: Pydantic response model of one item
+    :param model: Mapped class the rows come from
+    :param fast: bool: The fast query parameter of the endpoint
+    :return: A tuple of column expressions or None
+    """
+    return response_columns(schema, model) if fast else None
+
+
+def list_response(rows: Sequence, limit: int, cursor: Optional[str], fast: bool, **extra):
+    """
+    The list_response function builds the body of a paginated list endpoint, encoding it with orjson on the fast path.
+
+    :param rows: Sequence: ORM objects, or rows selected with list_columns when fast is set
+    :param limit: int: Page size that was requested
+    :param cursor: str: Cursor the page was requested with
+    :param fast: bool: The fast query parameter of the endpoint
+    :param extra: Additional body fields, e.g. total
+    :return: A JSON Response on the fast path, otherwise a dict for the response_model
+    """
+    following = next_cursor(rows, limit, cursor)
+    if fast:
+        return fast_list_response(rows, following, **extra)
+    return {"items": rows, "next_cursor": following, **extra}
@@ -0,0 +1,162 @@
+import base64
+import json
+import math
+from datetime import datetime, date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, tuple_, func
+
+from src.conf import messages
+
+# Мітка стовпця COUNT(*) OVER() - загальна кількість рядків вибірки поруч з кожним рядком сторінки
+TOTAL_COUNT = 'total_count'
+LEDGER_CURSOR_MAX_CURRENCIES = 16
+# Мітка сирого стовпця date у рядках fast-шляху, де date у відповіді обрізана до DATE
+CURSOR_DATE = 'cursor_date'
+
+
+def _pack(payload) -> str:
+    data = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def _unpack(cursor: str):
+    # ValueError покриває і зіпсований base64, і невалідний JSON
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(row_date: Optional[date], row_id: int) -> str:
+    """
+    The encode_cursor function packs the (date, id) position of a row into an opaque url-safe string.
+
+    :param row_date: date | None: The date of the last row on the page
+    :param row_id: int: The id of the last row on the page
+    :return: An opaque cursor string
+    """
+    return _pack([row_date.isoformat() if row_date is not None else None, row_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """
+    The decode_cursor function unpacks a cursor produced by encode_cursor.
+    A cursor that cannot be decoded raises an HTTPException with status code 400.
+
+    :param cursor: str: The cursor received from the client
+    :return: A (date, id) tuple
+    """
+    try:
+        row_date, row_id = _unpack(cursor)
+        return (datetime.fromisoformat(row_date) if row_date is not None else None), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_CURSOR)
+
+
+def encode_ledger_cursor(row_date: date, source: str, row_id: int, balances: Dict[str, float]) -> str:
+    """
+    The encode_ledger_cursor function packs the position of the last ledger row together with the running
+    balances reached on it, so the next page continues the balance without summing the rows before it.
+
+    :param row_date: date: The date of the last row on the page
+    :param source: str: The table of the last row, transaction or movement
+    :param row_id: int: The id of the last row on the page
+    :param balances: Dict[str, float]: Running balance per currency after the last row
+    :return: An opaque cursor string
+    """
+    return _pack([row_date.isoformat(), source, row_id, balances])
+
+
+def decode_ledger_cursor(cursor: str) -> Tuple[datetime, str, int, Dict[str, float]]:
+    """
+    The decode_ledger_cursor function unpacks a cursor produced by encode_ledger_cursor.
+    A cursor that cannot be decoded raises an HTTPException with status code 400.
+
+    :param cursor: str: The cursor received from the client
+    :return: A (date, source, id, balances) tuple
+    """
+    try:
+        row_date, source, row_id, balances = _unpack(cursor)
+        balances = {str(currency): float(balance) for currency, balance in balances.items()}
+        # Баланси приходять від клієнта: лише скінченні числа і не більше валют, ніж може мати рядок
+        if len(balances) > LEDGER_CURSOR_MAX_CURRENCIES or not all(
+                len(currency) <= 50 and math.isfinite(balance) for currency, balance in balances.items()):
+            raise ValueError(cursor)
+        return datetime.fromisoformat(row_date), str(source), int(row_id), balances
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_CURSOR)
+
+
+def paginate(query, model, limit: int, offset: int = 0, cursor: Optional[str] = None):
+    """
+    The paginate function orders a query by (date, id) and applies either keyset or offset pagination.
+    With a cursor the page starts right after the row the cursor points to, so Postgres seeks through
+    the (date, id) index instead of reading and discarding every skipped row; offset is then ignored.
+    Rows without a date come last, as in Postgres ascending order: cursor pages walk the dated rows first
+    and then, in a separate phase, the undated rows by id.
+
+    :param query: The query to paginate, already filtered
+    :param model: Mapped class with date and id columns
+    :param limit: int: Page size
+    :param offset: int: Number of rows to skip when no cursor is given
+    :param cursor: str: Cursor of the last row of the previous page
+    :return: The paginated query
+    """
+    query = query.order_by(model.date, model.id)
+    if cursor is None:
+        return query.offset(offset).limit(limit)
+
+    last_date, last_id = decode_cursor(cursor)
+    if last_date is None:
+        query = query.filter(and_(model.date.is_(None), model.id > last_id))
+    else:
+        # Лише датовані рядки: чистий range seek по (date, id); рядки без дати - окрема фаза (див. next_cursor)
+        query = query.filter(tuple_(model.date, model.id) > tuple_(last_date, last_id))
+    return query.limit(limit)
+
+
+async def fetch_page(db, query, columns: Optional[Sequence] = None) -> List:
+    """
+    The fetch_page function runs a paginated select of a model.
+    With columns only those columns are selected and rows are returned as tuples,
+    skipping ORM object construction (see src.services.fast_json).
+
+    :param db: AsyncSession: The database session
+    :param query: Select of a single model, already filtered and paginated
+    :param columns: Sequence: Explicit columns to select instead of the model
+    :return: A list of model instances, or of rows when columns are given
+    """
+    if columns is None:
+        return (await db.scalars(query)).all()
+    return (await db.execute(query.with_only_columns(*columns))).all()
+
+
+def total_count_column():
+    """
+    The total_count_column function returns COUNT(*) OVER() labeled TOTAL_COUNT.
+    Added to a filtered select, it is evaluated before LIMIT/OFFSET, so every row of the page
+    carries the number of rows matching the filters and no separate count query is needed.
+
+    :return: A labeled window expression
+    """
+    return func.count().over().label(TOTAL_COUNT)
+
+
+def next_cursor(rows: List, limit: int, cursor: Optional[str] = None) -> Optional[str]:
+    """
+    The next_cursor function returns the cursor of the following page, or None on the last page.
+    When a page of the dated phase comes back short, the dated rows are exhausted and the returned cursor
+    starts the phase of rows without a date.
+
+    :param rows: List: Rows of the current page, ordered by (date, id)
+    :param limit: int: Page size that was requested
+    :param cursor: str: Cursor the current page was requested with
+    :return: A cursor string or None
+    """
+    if rows and len(rows) >= limit:
+        last = rows[-1]
+        # Курсор завжди з повної мітки часу: обрізана до дня дата пропустила б чи повторила рядки того ж дня
+        return encode_cursor(getattr(last, CURSOR_DATE, last.date), last.id)
+    if cursor is not None and decode_cursor(cursor)[0] is not None:
+        return encode_cursor(None, 0)
+    return None
@@ -0,0 +1,75 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import event
+
+from src.conf import messages
+from src.conf.config import settings
+from src.database.models import Products
+
+PRODUCT_NAME_COLUMNS = ('english_name', 'ukrainian_name', 'russian_name', 'turkish_name')
+
+# мовна колонка -> (версія таблиці, момент завантаження, повний список (product_id, назва))
+_lists: Dict[str, Tuple[str, float, List[Tuple[int, str]]]] = {}
+
+
+def name_column(language: str):
+    """
+    The name_column function maps the language query parameter to the Products column with names in that language.
+
+    :param language: str: One of PRODUCT_NAME_COLUMNS
+    :return: The Products column
+    """
+    if language not in PRODUCT_NAME_COLUMNS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_LANGUAGE)
+    return getattr(Products, language)
+
+
+def remember(language: str, version: str, names: List[Tuple[int, str]]) -> None:
+    """
+    The remember function stores the full product list of a language read at the given table version.
+    The previous list of the language is replaced, so products deleted since then disappear from the cache.
+
+    :param language: str: Language column the names belong to
+    :param version: str: Table version from src.services.etag.table_version at the time of the read
+    :param names: List[Tuple[int, str]]: Every (product_id, name) pair, ordered by id
+    :return: None
+    """
+    _lists[language] = (version, time.monotonic(), list(names))
+
+
+def list_names(language: str, version: str) -> Optional[List[Tuple[int, str]]]:
+    """
+    The list_names function returns the cached product list for a language if it was read at the same
+    table version and is younger than settings.product_names_ttl. The version catches inserts, deletes and
+    ORM updates made by any process; the TTL bounds staleness of raw UPDATEs that leave updated_at as is.
+
+    :param language: str: Language column
+    :param version: str: Current table version
+    :return: A list of (product_id, name) pairs, or None if the list has to be read from the database
+    """
+    cached = _lists.get(language)
+    if cached is None:
+        return None
+    cached_version, loaded, names = cached
+    if cached_version != version or time.monotonic() - loaded > settings.product_names_ttl:
+        return None
+    return names
+
+
+def invalidate() -> None:
+    """
+    The invalidate function drops all cached product lists.
+
+    :return: None
+    """
+    _lists.clear()
+
+
+@event.listens_for(Products, 'after_insert')
+@event.listens_for(Products, 'after_update')
+@event.listens_for(Products, 'after_delete')
+def _on_product_change(mapper, connection, target) -> None:
+    # Зміни в цьому процесі скидають кеш одразу, не чекаючи на перевірку версії
+    invalidate()
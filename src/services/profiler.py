@@ -0,0 +1,51 @@
+import json
+import logging
+import time
+
+from sqlalchemy import event
+
+from src.conf.config import settings
+from src.services.timing import current_timing
+
+slow_query_logger = logging.getLogger('slow_query')
+
+_MAX_PARAMS_LENGTH = 1000
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    stats = current_timing()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+        stats.rows += max(getattr(cursor, 'rowcount', 0) or 0, 0)
+
+    if elapsed * 1000 >= settings.slow_query_threshold_ms:
+        if stats is not None:
+            stats.slow_queries += 1
+        slow_query_logger.warning(json.dumps({
+            'event': 'slow_query',
+            'route': stats.route_name if stats is not None else None,
+            'duration_ms': round(elapsed * 1000, 3),
+            'statement': statement,
+            'parameters': repr(parameters)[:_MAX_PARAMS_LENGTH],
+            'executemany': executemany,
+        }, ensure_ascii=False))
+
+
+def install_query_profiler(engine) -> None:
+    """
+    The install_query_profiler function attaches the cursor execute listeners to an engine.
+    For an AsyncEngine the listeners go on its sync_engine, where the cursor events are emitted.
+
+    :param engine: Engine or AsyncEngine
+    :return: None
+    """
+    sync_engine = getattr(engine, 'sync_engine', engine)
+    if not event.contains(sync_engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
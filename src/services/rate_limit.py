@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.models import User
+from src.services.auth.auth import auth_service
+from src.services.redis_pool import redis_manager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TokenBucket:
+    capacity: float
+    rate: float
+    seconds: int
+    tokens: float
+    updated: float = field(default_factory=time.monotonic)
+    # Витрачено локально, але ще не відправлено в Redis
+    pending: int = 0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimitStore:
+    """
+    Token buckets of this process, keyed by (route, user id).
+    Requests are admitted or rejected locally; consumption is pushed to Redis in batches by sync_loop,
+    and each bucket is clamped to what the other workers left of the shared per-window budget.
+    """
+
+    def __init__(self):
+        self.buckets: Dict[Tuple[str, int], TokenBucket] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def take(self, key: Tuple[str, int], capacity: float, seconds: int) -> float:
+        """
+        The take function consumes one token from the bucket of key.
+
+        :param key: Tuple[str, int]: Route name and user id
+        :param capacity: float: Requests allowed per window for this user
+        :param seconds: int: Window length
+        :return: 0 if the request is admitted, otherwise seconds until a token is available
+        """
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None or bucket.capacity != capacity:
+            bucket = self.buckets[key] = TokenBucket(capacity, capacity / seconds, seconds, capacity, now)
+        bucket.refill(now)
+        if bucket.tokens < 1:
+            return (1 - bucket.tokens) / bucket.rate
+        bucket.tokens -= 1
+        bucket.pending += 1
+        return 0
+
+    async def sync(self) -> None:
+        """
+        The sync function sends the pending consumption of every bucket to Redis in one pipeline
+        (INCRBY on a fixed-window counter shared by all workers) and lowers local buckets to the
+        budget that is left in the window. Idle full buckets are dropped.
+
+        :return: None
+        """
+        now = time.monotonic()
+        batch = []
+        for key, bucket in list(self.buckets.items()):
+            bucket.refill(now)
+            if bucket.pending:
+                batch.append((key, bucket, bucket.pending))
+                bucket.pending = 0
+            elif bucket.tokens >= bucket.capacity:
+                del self.buckets[key]
+        if not batch:
+            return
+
+        try:
+            pipe = redis_manager.client.pipeline(transaction=False)
+            for (route, user_id), bucket, used in batch:
+                redis_key = f"rate:{route}:{user_id}:{int(time.time() // bucket.seconds)}"
+                pipe.incrby(redis_key, used)
+                pipe.expire(redis_key, bucket.seconds * 2)
+            results = await pipe.execute()
+        except (RedisError, RuntimeError) as err:
+            logger.warning("rate limit sync failed: %s", err)
+            for _, bucket, used in batch:
+                bucket.pending += used
+            return
+
+        for (_, bucket, _), total in zip(batch, results[::2]):
+            bucket.tokens = min(bucket.tokens, max(bucket.capacity - total, 0))
+
+    async def sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.rate_limit_sync_interval)
+            await self.sync()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.sync_loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.sync()
+
+
+rate_limit_store = RateLimitStore()
+
+
+class RateLimiter:
+    """
+    Per-user, per-route rate limit dependency: RateLimiter(times=10, seconds=60).
+    The budget is multiplied by settings.rate_limit_role_multipliers for the user's role.
+    The check is an in-memory token bucket, so it adds no network round-trip to the request.
+    """
+
+    def __init__(self, times: int = 1, seconds: int = 0, minutes: int = 0, hours: int = 0):
+        self.times = times
+        self.seconds = seconds + 60 * minutes + 3600 * hours
+        self.route: Optional[str] = None
+
+    async def __call__(self, request: Request, current_user: User = Depends(auth_service.get_current_user)):
+        if self.route is None:
+            endpoint = request.scope.get('endpoint')
+            self.route = f"{endpoint.__module__}.{endpoint.__name__}" if endpoint else request.url.path
+        role = getattr(current_user.roles, 'value', current_user.roles)
+        capacity = self.times * settings.rate_limit_role_multipliers.get(role, 1)
+        retry_after = rate_limit_store.take((self.route, current_user.id), capacity, self.seconds)
+        if retry_after:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests",
+                                headers={"Retry-After": str(math.ceil(retry_after))})
@@ -0,0 +1,198 @@
+import time
+from collections import deque
+from typing import Optional
+
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError
+
+from src.conf.config import settings
+
+# Вікно для commands/sec, секунд
+_RATE_WINDOW = 60
+
+
+class InstrumentedBlockingPool(redis.BlockingConnectionPool):
+    """
+    BlockingConnectionPool that records how long commands wait for a free connection,
+    how often the pool runs dry and how many connections are checked out.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def reset(self):
+        super().reset()
+        # Видані з'єднання рахуються тут, а не через приватну чергу пулу
+        self._checked_out = set()
+
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except ConnectionError as err:
+            # Тайм-аут - лише вичерпаний пул; збій підключення до Redis рахується окремо
+            if 'No connection available' in str(err) or time.perf_counter() - started >= self.timeout:
+                self.checkout_timeouts += 1
+            else:
+                self.checkout_errors += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        self._checked_out.add(connection)
+        return connection
+
+    async def release(self, connection):
+        self._checked_out.discard(connection)
+        await super().release(connection)
+
+    def stats(self) -> dict:
+        created = len(self._connections)
+        in_use = len(self._checked_out)
+        return {
+            'max_connections': self.max_connections,
+            'created': created,
+            'in_use': in_use,
+            'idle': created - in_use,
+            'saturation': in_use / self.max_connections if self.max_connections else 0.0,
+            'checkout_timeouts': self.checkout_timeouts,
+            'checkout_errors': self.checkout_errors,
+            'checkout_wait_avg_ms': self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            'checkout_wait_max_ms': self.wait_max * 1000,
+        }
+
+
+class CommandStats:
+    def __init__(self):
+        self.commands = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self._recent = deque()
+
+    def record(self, elapsed: float, failed: bool) -> None:
+        now = time.monotonic()
+        self.commands += 1
+        self.errors += failed
+        self.latency_total += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+        self._recent.append(now)
+        while self._recent and self._recent[0] < now - _RATE_WINDOW:
+            self._recent.popleft()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        while self._recent and self._recent[0] < now - _RATE_WINDOW:
+            self._recent.popleft()
+        return {
+            'commands': self.commands,
+            'errors': self.errors,
+            'commands_per_sec': len(self._recent) / _RATE_WINDOW,
+            'latency_avg_ms': self.latency_total / self.commands * 1000 if self.commands else 0.0,
+            'latency_max_ms': self.latency_max * 1000,
+        }
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    Async Redis client that counts commands and their latency (pipelines count as one command).
+    """
+
+    command_stats: CommandStats
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await super().execute_command(*args, **options)
+            failed = False
+            return result
+        finally:
+            self.command_stats.record(time.perf_counter() - started, failed)
+
+
+class RedisManager:
+    """
+    Owner of the single Redis connection pool of the application.
+    The pool is opened in the lifespan handler of the app and closed on shutdown;
+    everything that talks to Redis takes the client from redis_manager.client.
+    The process-global client is deliberate: the auth user cache, the rate limit sync task
+    and the response cache also run outside of a request, where a dependency cannot be injected.
+    """
+
+    def __init__(self):
+        self._client: Optional[redis.Redis] = None
+        self.command_stats = CommandStats()
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            raise RuntimeError("Redis pool is not started")
+        return self._client
+
+    async def start(self) -> redis.Redis:
+        """
+        The start function opens the Redis pool configured in Settings.
+        With settings.redis_fake the connections go to an in-memory fakeredis server, for tests and local runs;
+        the pool and the client are instrumented the same way in both modes.
+
+        :return: The shared client
+        """
+        if self._client is not None:
+            return self._client
+        pool_options = dict(
+            db=0,
+            max_connections=settings.redis_max_connections,
+            timeout=settings.redis_pool_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_timeout,
+            health_check_interval=settings.redis_health_check_interval,
+        )
+        if settings.redis_fake:
+            # fakeredis - dev-залежність (requirements-dev.txt); з'єднання з тим самим пулом і метриками
+            from fakeredis import FakeServer
+            from fakeredis.aioredis import FakeConnection
+
+            pool = InstrumentedBlockingPool(connection_class=FakeConnection, server=FakeServer(), **pool_options)
+        else:
+            pool = InstrumentedBlockingPool(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                password=settings.redis_password,
+                **pool_options,
+            )
+        client = InstrumentedRedis(connection_pool=pool)
+        client.command_stats = self.command_stats
+        await client.ping()
+        self._client = client
+        return client
+
+    async def close(self) -> None:
+        if self._client is None:
+            return
+        client, self._client = self._client, None
+        await client.close()
+        if isinstance(client.connection_pool, InstrumentedBlockingPool):
+            await client.connection_pool.disconnect()
+
+    def metrics(self) -> dict:
+        """
+        The metrics function reports command throughput and latency together with pool saturation.
+
+        :return: A dict with RedisMetricsResponse fields
+        """
+        metrics = self.command_stats.stats()
+        pool = getattr(self._client, 'connection_pool', None)
+        if isinstance(pool, InstrumentedBlockingPool):
+            metrics['pool'] = pool.stats()
+        return metrics
+
+
+redis_manager = RedisManager()
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import Response
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.services.compression import SUPPORTED_ENCODINGS, choose_encoding, compress
+from src.services.redis_pool import redis_manager
+
+logger = logging.getLogger(__name__)
+
+TURNOVER_NAMESPACE = 'turnover'
+CACHE_HEADER = 'X-Cache'
+
+# Single-flight усередині процесу: один обчислювач на ключ, решта чекає на його результат
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _version_key(namespace: str) -> str:
+    return f"cache:version:{namespace}"
+
+
+def cache_key(namespace: str, version: int, route: str, params: dict) -> str:
+    """
+    The cache_key function builds the Redis key of a cached response.
+    Parameters are normalized (sorted, JSON-encoded) so that the same query in a different order hits the same entry.
+
+    :param namespace: str: Group of responses invalidated together
+    :param version: int: Current version of the namespace
+    :param route: str: Route the response belongs to
+    :param params: dict: Query parameters that change the response
+    :return: The key
+    """
+    normalized = json.dumps(params, sort_keys=True, default=str, separators=(',', ':'))
+    digest = hashlib.sha1(normalized.encode()).hexdigest()
+    return f"cache:{namespace}:{version}:{route}:{digest}"
+
+
+async def bump_version(namespace: str) -> None:
+    """
+    The bump_version function invalidates every cached response of a namespace at once:
+    keys embed the version, so after INCR the old entries are never read again and expire on their own.
+
+    :param namespace: str: Namespace to invalidate
+    :return: None
+    """
+    try:
+        await redis_manager.client.incr(_version_key(namespace))
+    except (RedisError, RuntimeError) as err:
+        logger.warning("cache version bump failed for %s: %s", namespace, err)
+
+
+async def _store(key: str, body: bytes) -> None:
+    # Стиснуті варіанти пишуться разом з тілом: стискання відбувається один раз на запис кешу
+    pipe = redis_manager.client.pipeline(transaction=False)
+    pipe.setex(key, settings.response_cache_ttl, body)
+    if len(body) >= settings.compression_min_size:
+        for encoding in SUPPORTED_ENCODINGS:
+            pipe.setex(f"{key}:{encoding}", settings.response_cache_ttl, compress(body, encoding))
+    await pipe.execute()
+
+
+def _response(body: bytes, cache_status: str, encoding: Optional[str] = None) -> Response:
+    headers = {CACHE_HEADER: cache_status}
+    if encoding is not None:
+        headers.update({'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'})
+    return Response(content=body, media_type='application/json', headers=headers)
+
+
+async def _compute_once(key: str, compute: Callable[[], Awaitable[bytes]]) -> bytes:
+    r = redis_manager.client
+    lock_key = f"{key}:lock"
+    lock_ttl = settings.response_cache_lock_timeout
+    if await r.set(lock_key, 1, nx=True, px=int(lock_ttl * 1000)):
+        try:
+            body = await compute()
+            try:
+                await _store(key, body)
+            except RedisError as err:
+                logger.warning("response cache write failed: %s", err)
+        finally:
+            try:
+                await r.delete(lock_key)
+            except RedisError:
+                pass
+        return body
+
+    # Інший воркер уже рахує цей ключ - чекаємо його результат, а не йдемо в БД паралельно
+    waited = 0.0
+    while waited < lock_ttl:
+        await asyncio.sleep(settings.response_cache_poll_interval)
+        waited += settings.response_cache_poll_interval
+        body = await r.get(key)
+        if body is not None:
+            return body
+    return await compute()
+
+
+async def cached_response(namespace: str, route: str, params: dict,
+                          compute: Callable[[], Awaitable[bytes]], accept_encoding: Optional[str] = None) -> Response:
+    """
+    The cached_response function serves a JSON response from Redis, computing it on a miss.
+    Entries are pre-serialized bytes, so a hit skips both the database and serialization.
+    On a miss only one request across all workers recomputes the entry; the others wait for it.
+    Large entries are also stored brotli/gzip-compressed; a hit for a client that accepts
+    one of those codings is served precompressed and CompressionMiddleware leaves it alone.
+    If Redis is unavailable the response is computed directly.
+
+    :param namespace: str: Namespace the response is invalidated with (see bump_version)
+    :param route: str: Route the response belongs to
+    :param params: dict: Query parameters that change the response
+    :param compute: Callable: Coroutine function returning the serialized JSON body
+    :param accept_encoding: str: Accept-Encoding header of the request
+    :return: A JSON Response with an X-Cache header (HIT or MISS)
+    """
+    encoding = choose_encoding(accept_encoding)
+    try:
+        r = redis_manager.client
+        version = int(await r.get(_version_key(namespace)) or 0)
+        key = cache_key(namespace, version, route, params)
+        if encoding is None:
+            encoded, body = None, await r.get(key)
+        else:
+            encoded, body = await r.mget(f"{key}:{encoding}", key)
+    except (RedisError, RuntimeError) as err:
+        logger.warning("response cache unavailable: %s", err)
+        return _response(await compute(), 'BYPASS')
+    if encoded is not None:
+        return _response(encoded, 'HIT', encoding)
+    if body is not None:
+        return _response(body, 'HIT')
+
+    future = _inflight.get(key)
+    if future is None:
+        future = _inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            body = await _compute_once(key, compute)
+            future.set_result(body)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            # Помилку отримає кожен, хто чекає; позначаємо її як прочитану, якщо чекаючих немає
+            future.exception()
+            raise
+        finally:
+            _inflight.pop(key, None)
+    else:
+        body = await asyncio.shield(future)
+    return _response(body, 'MISS')
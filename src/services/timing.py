@@ -0,0 +1,203 @@
+import asyncio
+import bisect
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Межі кошиків гістограми в мс: геометрична шкала від 0.5 мс до ~2 хв, крок 25%
+LATENCY_BUCKETS_MS = [0.5 * 1.25 ** i for i in range(56)]
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class RequestTiming:
+    scope: Optional[dict] = None
+    route: Optional[str] = None
+    started: float = field(default_factory=time.perf_counter)
+    auth: float = 0.0
+    serialization: float = 0.0
+    endpoint_done: Optional[float] = None
+    queries: int = 0
+    db_time: float = 0.0
+    rows: int = 0
+    slow_queries: int = 0
+
+    @property
+    def route_name(self) -> Optional[str]:
+        if self.route is not None:
+            return self.route
+        if self.scope is None:
+            return None
+        return f"{self.scope.get('method')} {self.scope.get('path')}"
+
+    def server_timing(self) -> str:
+        total = (time.perf_counter() - self.started) * 1000
+        return (f'total;dur={total:.2f}, auth;dur={self.auth * 1000:.2f}, '
+                f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries, {self.rows} rows", '
+                f'serialization;dur={self.serialization * 1000:.2f}')
+
+
+_request_timing: ContextVar[Optional[RequestTiming]] = ContextVar('request_timing', default=None)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    """
+    The current_timing function returns the timing record of the request being handled, if any.
+
+    :return: RequestTiming or None outside a request
+    """
+    return _request_timing.get()
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    The timed context manager adds the time spent in its block to a phase (auth, serialization) of the current request.
+
+    :param phase: str: Name of a RequestTiming attribute
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing = _request_timing.get()
+        if timing is not None:
+            setattr(timing, phase, getattr(timing, phase) + time.perf_counter() - started)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram: constant memory per route, percentiles accurate to one bucket (25%).
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, duration_ms: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def percentile(self, percent: float) -> float:
+        rank = self.count * percent / 100
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                # Верхня межа кошика, але не більше за фактичний максимум
+                upper = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+                return min(upper, self.max_ms)
+        return 0.0
+
+
+route_latency: Dict[str, LatencyHistogram] = {}
+
+
+def latency_summary() -> List[dict]:
+    """
+    The latency_summary function reports request count and latency percentiles for every route served so far.
+
+    :return: A list of dicts with RouteLatencyResponse fields, slowest p99 first
+    """
+    summary = []
+    for route, histogram in route_latency.items():
+        item = {'route': route, 'count': histogram.count,
+                'avg_ms': histogram.total_ms / histogram.count if histogram.count else 0.0,
+                'max_ms': histogram.max_ms}
+        item.update({f'p{percent}_ms': histogram.percentile(percent) for percent in PERCENTILES})
+        summary.append(item)
+    return sorted(summary, key=lambda item: item['p99_ms'], reverse=True)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware that times every HTTP request. The response gets a Server-Timing header
+    with total, auth, db and serialization durations, and the full request duration goes
+    to the latency histogram of the matched route.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(scope=scope)
+        token = _request_timing.set(timing)
+
+        async def send_with_timing(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                MutableHeaders(scope=message).append('Server-Timing', timing.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timing.reset(token)
+            if timing.route is not None:
+                route_latency.setdefault(timing.route, LatencyHistogram()).record(
+                    (time.perf_counter() - timing.started) * 1000)
+
+
+def _mark_endpoint_done() -> None:
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.endpoint_done = time.perf_counter()
+
+
+def _timed_endpoint(call: Callable) -> Callable:
+    # Обгортка зберігає async/sync природу ендпоінта - FastAPI вирішує за нею, чи запускати його в threadpool
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def timed_call(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                _mark_endpoint_done()
+    else:
+        @functools.wraps(call)
+        def timed_call(*args, **kwargs):
+            try:
+                return call(*args, **kwargs)
+            finally:
+                _mark_endpoint_done()
+    timed_call.timed = True
+    return timed_call
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that names the request for the latency histogram and measures serialization:
+    the time from the endpoint returning to the response object being ready.
+    """
+
+    def get_route_handler(self) -> Callable:
+        if not getattr(self.dependant.call, 'timed', False):
+            self.dependant.call = _timed_endpoint(self.dependant.call)
+        handler = super().get_route_handler()
+        route_name = f"{','.join(sorted(self.methods))} {self.path_format}"
+
+        async def timed_handler(request: Request):
+            timing = _request_timing.get()
+            if timing is not None:
+                timing.route = route_name
+            response = await handler(request)
+            if timing is not None and timing.endpoint_done is not None:
+                timing.serialization += time.perf_counter() - timing.endpoint_done
+            return response
+
+        return timed_handler
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy.sql.dml import Delete, Insert
+from sqlalchemy.sql.selectable import Select
+
+from src.repository.costing import recompute_costing, touch
+
+
+class RecordingSession:
+    """Записує виконані оператори; закупівлі повертає із заданого списку в порядку запитів."""
+
+    def __init__(self, purchases: list):
+        self.purchases = list(purchases)
+        self.statements = []
+
+    async def flush(self):
+        pass
+
+    async def scalar(self, statement):
+        self.statements.append(statement)
+        return None
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        if isinstance(statement, Select) and 'operation_type' in statement.selected_columns.keys():
+            return self.purchases.pop(0)
+        return []
+
+
+def test_purchase_moved_to_lower_product_deletes_before_insert():
+    moved_on = datetime(2024, 3, 1)
+    moved = SimpleNamespace(id=7, date=moved_on, operation_type='income', quantity=5,
+                            sum_total_tl=100, sum_total_usd=10)
+    affected = {}
+    touch(affected, SimpleNamespace(product_id=2, date=moved_on))
+    touch(affected, SimpleNamespace(product_id=1, date=moved_on))
+    # Продукт 1 перераховується першим і отримує перенесену закупівлю, продукт 2 - порожній
+    db = RecordingSession([[moved], []])
+
+    asyncio.run(recompute_costing(affected, db))
+
+    kinds = [type(statement) for statement in db.statements if isinstance(statement, (Delete, Insert))]
+    assert kinds.count(Delete) == 2
+    assert kinds.count(Insert) == 1
+    assert kinds.index(Insert) > max(i for i, kind in enumerate(kinds) if kind is Delete)